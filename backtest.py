@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+T0评分策略回测 - 不依赖Kivy和网络
+用 TickStore 中存储的分时逐根计算评分，按与App相同的信号/仓位规则模拟交易
+
+回测: python backtest.py --root ticks --days 60                (全部股票)
+      python backtest.py 600586,000001 --days 20 --workers 4
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from signals import BUY, SELL, SignalPipeline
+from tick_store import TickStore
+
+STEP = 0.2  # 同 _sim_buy 每次加仓比例
+
+
+# ==================== 仓位模拟 ====================
+def simulate(prices, scores, buy=BUY, sell=SELL, step=STEP, seg=None):
+    """向量化执行 _sim_buy/_sim_sell 规则
+
+    评分>=buy 加仓step（上限满仓，成本记为本次买价）；评分<=sell 且有持仓时全部卖出，
+    单笔盈亏% = (卖价-成本)/成本*100。返回 (每笔盈亏%, 每笔卖出时仓位, 每根K线持仓, 每根K线浮动+已实现盈亏%)
+    seg 为每根K线所属段（股票）的起始下标，多只股票拼接时各段独立建仓，净值各自从0开始。
+    """
+    n = len(prices)
+    ar = np.arange(n)
+    seg = np.zeros(n, dtype=np.int64) if seg is None else seg
+    b = scores >= buy
+    s = scores <= sell
+    last_buy = np.maximum.accumulate(np.where(b, ar, -1))
+    prev_sell = np.r_[-1, np.maximum.accumulate(np.where(s, ar, -1))[:-1]]
+    prev_sell = np.maximum(prev_sell, seg - 1)
+    nbuy = np.cumsum(b)
+    # 上一次卖出信号之后的买入次数（卖出信号会清仓，无持仓时为空操作）
+    since = nbuy - np.r_[0, nbuy][prev_sell + 1]
+    hold = np.minimum(step * np.where(s, 0, since), 1.0)
+    trade = np.flatnonzero(s & (last_buy > prev_sell))
+    cost_i = last_buy[trade]
+    profit = (prices[trade] - prices[cost_i]) / prices[cost_i] * 100
+    ratio = np.minimum(step * since[trade], 1.0)
+    # 净值曲线: 已实现盈亏累计 + 持仓浮动盈亏（与App的 position['profit'] 同为不按仓位加权的百分比）
+    realized = np.zeros(n)
+    realized[trade] = profit
+    realized = np.cumsum(realized)
+    realized -= np.r_[0, realized][seg]
+    cost = prices[np.maximum(last_buy, 0)]
+    floating = np.where(hold > 0, (prices - cost) / cost * 100, 0)
+    return profit, ratio, hold, realized + floating
+
+
+def _stats(code, profit, ratio, hold, equity, bars, days):
+    dd = np.maximum.accumulate(np.r_[0, equity]) - np.r_[0, equity]
+    return {
+        'code': code, 'days': days, 'bars': bars, 'trades': len(profit),
+        'profit': float(profit.sum()),
+        'weighted': float((profit * ratio).sum()),
+        'win_rate': float((profit > 0).mean()) if len(profit) else 0.0,
+        'max_dd': float(dd.max()),
+        'turnover': float(np.abs(np.diff(np.r_[0, hold])).sum()),
+    }
+
+
+def backtest_symbol(root, code, days=60, buy=BUY, sell=SELL, step=STEP):
+    """单只股票回测，返回统计dict；可在子进程中执行"""
+    dates, times, prices, volumes = TickStore(root).history(code, days)
+    scores = SignalPipeline(buy=buy, sell=sell).score_history(dates, times, prices, volumes)
+    return _stats(code, *simulate(prices, scores, buy, sell, step), len(prices), len(np.unique(dates)))
+
+
+def _run_one(args):
+    return backtest_symbol(*args)
+
+
+# ==================== 汇总 ====================
+def run(root, codes=None, days=60, workers=None, buy=BUY, sell=SELL, step=STEP):
+    """多进程回测，返回 (每只股票统计列表, 汇总)"""
+    if codes is None:
+        codes = sorted(os.listdir(root)) if os.path.isdir(root) else []
+    jobs = [(root, code, days, buy, sell, step) for code in codes]
+    if workers == 1 or len(jobs) <= 1:
+        results = [_run_one(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(_run_one, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))))
+    return results, summarize(results)
+
+
+def summarize(results):
+    trades = sum(r['trades'] for r in results)
+    wins = sum(r['win_rate'] * r['trades'] for r in results)
+    return {
+        'symbols': len(results), 'bars': sum(r['bars'] for r in results), 'trades': trades,
+        'profit': sum(r['profit'] for r in results),
+        'avg_profit': sum(r['profit'] for r in results) / len(results) if results else 0.0,
+        'win_rate': wins / trades if trades else 0.0,
+        'max_dd': max((r['max_dd'] for r in results), default=0.0),
+        'turnover': sum(r['turnover'] for r in results),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='T0评分策略回测')
+    ap.add_argument('codes', nargs='?', default='', help='逗号分隔的股票代码，默认TickStore中全部')
+    ap.add_argument('--root', default='ticks', help='TickStore目录')
+    ap.add_argument('--days', type=int, default=60)
+    ap.add_argument('--workers', type=int, default=None, help='进程数，默认CPU核数')
+    ap.add_argument('--buy', type=int, default=BUY)
+    ap.add_argument('--sell', type=int, default=SELL)
+    ap.add_argument('--step', type=float, default=STEP)
+    args = ap.parse_args(argv)
+    if not os.path.isdir(args.root):
+        ap.error(f'TickStore目录不存在: {args.root}（用 --root 指定）')
+    codes = [c.strip() for c in args.codes.split(',') if c.strip()] or None
+    if not codes and not os.listdir(args.root):
+        ap.error(f'{args.root} 中没有股票数据')
+    t = time.perf_counter()
+    results, total = run(args.root, codes, args.days, args.workers, args.buy, args.sell, args.step)
+    for r in sorted(results, key=lambda r: -r['profit'])[:20]:
+        print(f"{r['code']} 交易{r['trades']:4d} 盈亏{r['profit']:+8.2f}% 胜率{r['win_rate']*100:5.1f}% "
+              f"回撤{r['max_dd']:6.2f}% 换手{r['turnover']:6.1f}")
+    for k, v in total.items():
+        print(f'{k:>10}: {v:.3f}' if isinstance(v, float) else f'{k:>10}: {v}')
+    print(f'   elapsed: {time.perf_counter() - t:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准 - 不依赖Kivy和网络
+用法: python bench.py
+"""
+
+import random
+import time
+
+from market_data import _parse_quote, parse_quotes_raw, QUOTE_DTYPE, parse_minute_raw
+
+NAMES = ['金晶科技', '平安银行', '贵州茅台', '五粮液', '招商银行', '中国平安', '宁德时代', '比亚迪']
+
+
+def _timeit(fn, repeat=20):
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def _report(title, old, new):
+    print(f'{title}: 旧 {old*1000:.3f} ms, 新 {new*1000:.3f} ms, 加速 {old/new:.1f}x')
+
+
+# ==================== 行情解析 ====================
+def make_quote_payload(n, seed=0):
+    """构造与qt.gtimg.cn格式一致的批量行情响应（GBK编码，每行约88个字段）"""
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(n):
+        code = f'{600000 + i:06d}' if i % 2 else f'{i:06d}'
+        price = round(rnd.uniform(3, 200), 2)
+        f = ['1', rnd.choice(NAMES), code] + [f'{rnd.uniform(0, 1e5):.2f}' for _ in range(85)]
+        f[3] = f'{price:.2f}'
+        f[32] = f'{rnd.uniform(-10, 10):.2f}'
+        sym = ('sh' if code.startswith('6') else 'sz') + code
+        lines.append(f'v_{sym}="' + '~'.join(f) + '";')
+    return ('\n'.join(lines) + '\n').encode('gbk')
+
+
+def old_quote_parse(raw):
+    """原 fetch_quote 的做法：整体解码成str，每只股票切成几十个字符串再建dict"""
+    out = {}
+    for line in raw.decode('gbk').split('\n'):
+        head, sep, body = line.partition('="')
+        if sep:
+            p = body.rstrip().rstrip(';').rstrip('"').split('~')
+            q = _parse_quote(p[2], p)
+            if q: out[q['code']] = q
+    return out
+
+
+def bench_quote_parse(sizes=(1, 60, 200, 1000)):
+    import numpy as np
+    for n in sizes:
+        raw = make_quote_payload(n)
+        buf = np.zeros(n, dtype=QUOTE_DTYPE)
+        old = _timeit(lambda: old_quote_parse(raw))
+        new = _timeit(lambda: parse_quotes_raw(raw, out=buf))
+        _report(f'行情解析 {n:4d}只', old, new)
+
+
+# ==================== 分时解析 ====================
+def make_minute_payload(n=240, seed=0):
+    """构造与flashdata分时文件格式一致的全天数据"""
+    rnd = random.Random(seed)
+    price, vol = rnd.uniform(3, 200), 0
+    lines = ['min_data="', 'date:261016']
+    for i in range(n):
+        m = i if i < 120 else i + 90  # 跳过午休
+        price *= 1 + rnd.uniform(-0.002, 0.002)
+        vol += rnd.randint(100, 5000)
+        lines.append(f'{9 + (30 + m) // 60:02d}{(30 + m) % 60:02d} {price:.2f} {vol}')
+    return ('\\n\\\n'.join(lines) + '\\n\\\n";').encode('ascii')
+
+
+def old_minute_parse(raw):
+    """原 fetch_prices 的做法：按'\\n\\'切分后逐行float()"""
+    prices, volumes = [], []
+    for line in raw.decode('gbk').split('\\n\\')[1:]:
+        parts = line.strip().split(' ')
+        if len(parts) >= 3:
+            try:
+                prices.append(float(parts[1]))
+                volumes.append(float(parts[2]))
+            except:
+                pass
+    return prices, volumes
+
+
+def bench_minute_parse(symbols=200):
+    payloads = [make_minute_payload(seed=i) for i in range(symbols)]
+    old = _timeit(lambda: [old_minute_parse(raw) for raw in payloads], repeat=5)
+    new = _timeit(lambda: [parse_minute_raw(raw) for raw in payloads], repeat=5)
+    _report(f'分时解析 {symbols}只x240分钟', old, new)
+
+
+if __name__ == '__main__':
+    bench_quote_parse()
+    bench_minute_parse()
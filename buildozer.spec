@@ -9,6 +9,8 @@ package.domain = com.trading
 source.dir = .
 # 主文件
 source.include_exts = py,png,jpg,kv,atlas,json
+# 测试不打包进APK
+source.exclude_dirs = tests
 # 应用版本
 version = 1.0.0
 # 应用图标 (需要准备icon.png)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+K线合成与降采样 - 不依赖Kivy
+分时(每分钟一个价格) → 1/5/15/30/60分钟或日K线；K线数多于屏幕像素时按列合并
+"""
+
+import numpy as np
+
+PERIODS = (1, 5, 15, 30, 60, 'day')
+
+CANDLE_DTYPE = np.dtype([('date', 'U6'), ('time', 'i4'), ('open', 'f8'), ('high', 'f8'),
+                         ('low', 'f8'), ('close', 'f8'), ('volume', 'f8')])
+
+
+def _session_minute(times):
+    """HHMM -> 当日第几个交易分钟: 9:30为0，11:30为120，13:01为121，15:00为240"""
+    t = np.asarray(times, dtype=np.int64)
+    mins = t // 100 * 60 + t % 100
+    return np.maximum(np.where(mins <= 690, mins - 570, mins - 660), 0)
+
+
+def _hhmm(m):
+    """_session_minute 的逆变换，120对应11:30"""
+    mins = np.where(m <= 120, m + 570, m + 660)
+    return mins // 60 * 100 + mins % 60
+
+
+def _reduce(dates, times, prices, volumes, starts):
+    n = len(prices)
+    ends = np.r_[starts[1:], n]
+    out = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    if not len(starts):
+        return out
+    out['date'] = np.asarray(dates)[ends - 1]
+    out['time'] = np.asarray(times)[ends - 1]
+    out['open'] = prices[starts]
+    out['high'] = np.maximum.reduceat(prices, starts)
+    out['low'] = np.minimum.reduceat(prices, starts)
+    out['close'] = prices[ends - 1]
+    out['volume'] = np.add.reduceat(volumes, starts)
+    return out
+
+
+def resample(dates, times, prices, volumes, period=5):
+    """按周期合成K线，返回 CANDLE_DTYPE 结构数组；date 为交易日，time 为K线结束时刻(HHMM)
+
+    period 为分钟数或'day'。分钟K线按交易时间对齐（9:30并入第一根，11:30与13:00之间不跨越），
+    成交量为各分钟成交量之和。输入可以是 TickStore.history 返回的多日数据。
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+    dates = np.asarray(dates)
+    n = len(prices)
+    if not n:
+        return np.empty(0, dtype=CANDLE_DTYPE)
+    day = np.cumsum(np.r_[0, dates[1:] != dates[:-1]])
+    if period == 'day':
+        key = day
+    else:
+        m = _session_minute(times)
+        if period == 1:
+            key = day * 1000 + m
+        else:
+            b = np.maximum(m - 1, 0) // period
+            key = day * 1000 + b
+            times = _hhmm(np.minimum((b + 1) * period, 240))
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    return _reduce(dates, times, prices, volumes, starts)
+
+
+def lod_groups(n, max_bars, offset=0):
+    """把n根K线分组使组数不超过max_bars，返回各组 (起点, 终点)；
+
+    组边界对齐到全局序号(offset+i)的整数倍，平移视窗时已有分组不变，画面不抖动。
+    """
+    if n <= max_bars:
+        starts = np.arange(n)
+        return starts, starts + 1
+    k = -(-n // max(max_bars - 1, 1))  # 首尾两组可能不满
+    first = (-offset) % k
+    starts = np.r_[0, np.arange(first or k, n, k)]
+    return starts, np.r_[starts[1:], n]
+
+
+def downsample(c, max_bars, offset=0):
+    """K线数多于max_bars时按组合并（开=首、收=尾、高=最高、低=最低、量=求和）"""
+    starts, ends = lod_groups(len(c), max_bars, offset)
+    if len(starts) == len(c):
+        return c
+    out = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    out['date'] = c['date'][ends - 1]
+    out['time'] = c['time'][ends - 1]
+    out['open'] = c['open'][starts]
+    out['high'] = np.maximum.reduceat(c['high'], starts)
+    out['low'] = np.minimum.reduceat(c['low'], starts)
+    out['close'] = c['close'][ends - 1]
+    out['volume'] = np.add.reduceat(c['volume'], starts)
+    return out
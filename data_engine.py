@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+后台数据引擎 - 不依赖Kivy
+一个常驻线程运行asyncio事件循环，统一负责所有轮询任务
+"""
+
+import asyncio
+import collections
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Job:
+    def __init__(self, name, fn, callback, follow, interval=None):
+        self.name = name
+        self.fn = fn
+        self.callback = callback
+        self.follow = follow      # 是否跟随当前股票（切换后旧结果作废）
+        self.interval = interval  # None表示单次任务
+        self.code = None          # 正在请求的股票
+        self.task = None
+
+
+class DataEngine:
+    """asyncio数据引擎
+
+    - submit/schedule 在任意线程调用，任务在引擎线程的事件循环中执行
+    - 阻塞的HTTP请求放到有界线程池，最多 max_concurrency 个同时进行
+    - 周期任务上一轮未完成不会开始下一轮
+    - 结果放入队列，通过 notify() 通知UI线程调用 drain() 统一派发
+    """
+
+    def __init__(self, max_concurrency=4, current=None):
+        self.max_concurrency = max_concurrency
+        self.current = current or (lambda: None)
+        self.notify = lambda: None
+        self.loop = None
+        self._thread = None
+        self._executor = None
+        self._jobs = {}
+        self._results = collections.deque()
+        self._lock = threading.Lock()
+
+    # ---------- 生命周期 ----------
+    def start(self):
+        with self._lock:
+            if self._thread:
+                return
+            self.loop = asyncio.new_event_loop()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                thread_name_prefix='engine-io')
+            self._thread = threading.Thread(target=self._run_loop, name='data-engine', daemon=True)
+            self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def stop(self):
+        with self._lock:
+            if not self._thread:
+                return
+            self.loop.call_soon_threadsafe(self._stop_all)
+            self._thread.join(timeout=2)
+            self._executor.shutdown(wait=False)
+            self._thread = None
+
+    def _stop_all(self):
+        for job in list(self._jobs.values()):
+            job.task.cancel()
+        self._jobs.clear()
+        self.loop.stop()
+
+    # ---------- 任务接口（线程安全） ----------
+    def submit(self, name, fn, callback=None, follow=False):
+        """单次任务；同名任务还在进行时先取消旧任务"""
+        self._call(self._add, _Job(name, fn, callback, follow))
+
+    def schedule(self, name, interval, fn, callback=None, follow=False, delay=0):
+        """周期任务，每轮结束后间隔interval秒再开始下一轮；同名任务会被替换"""
+        self._call(self._add, _Job(name, fn, callback, follow, interval), delay)
+
+    def cancel(self, name):
+        self._call(self._cancel, name)
+
+    def switch(self, code):
+        """当前股票已切换：取消仍在请求旧股票的任务，周期任务立即按新股票重启
+
+        线程池里已经开始的请求无法中断，会照常跑完，但任务已取消，结果不会进入队列；
+        切换前已进入队列的旧股票结果由 drain 丢弃。
+        """
+        self._call(self._switch, code)
+
+    def _call(self, fn, *args):
+        self.start()
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    # ---------- 事件循环内 ----------
+    def _add(self, job, delay=0):
+        self._cancel(job.name)
+        self._jobs[job.name] = job
+        job.task = self.loop.create_task(self._drive(job, delay))
+
+    def _cancel(self, name):
+        job = self._jobs.pop(name, None)
+        if job:
+            job.task.cancel()
+
+    def _switch(self, code):
+        # 取消后 _run_once 的 await 抛出 CancelledError，线程池中请求的返回值被忽略
+        for job in list(self._jobs.values()):
+            if job.follow and job.code is not None and job.code != code:
+                self._cancel(job.name)
+                if job.interval is not None:
+                    self._add(_Job(job.name, job.fn, job.callback, job.follow, job.interval))
+
+    async def _drive(self, job, delay):
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            while True:
+                await self._run_once(job)
+                if job.interval is None:
+                    break
+                await asyncio.sleep(job.interval)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if self._jobs.get(job.name) is job and job.interval is None:
+                del self._jobs[job.name]
+
+    async def _run_once(self, job):
+        args = ()
+        if job.follow:
+            job.code = self.current()
+            args = (job.code,)
+        try:
+            result = await self.loop.run_in_executor(self._executor, job.fn, *args)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            traceback.print_exc()
+            return
+        finally:
+            code, job.code = job.code, None
+        if job.callback:
+            self._results.append((job.callback, result, code if job.follow else None))
+            self.notify()
+
+    # ---------- UI线程 ----------
+    def drain(self, *a):
+        """在UI线程派发已完成的结果，丢弃属于旧股票的结果"""
+        while self._results:
+            callback, result, code = self._results.popleft()
+            if code is not None and code != self.current():
+                continue
+            callback(result)
@@ -0,0 +1,566 @@
+# -*- coding: utf-8 -*-
+"""
+技术指标与评分 - 不依赖Kivy
+"""
+
+import collections
+import copy
+import math
+import threading
+from datetime import datetime
+
+import numpy as np
+
+# ==================== 技术分析 ====================
+def calc_rsi(p, n=14):
+    if len(p) < n+1: return 50
+    d = np.diff(p[-n-1:])
+    return round(100 - 100 / (1 + np.mean(np.maximum(d,0)) / (np.mean(np.maximum(-d,0))+1e-9)), 1)
+
+def calc_macd(p):
+    if len(p) < 26: return 0, 0, 0
+    def ema(d, n):
+        a = 2/(n+1)
+        e = [d[0]]
+        for i in range(1, len(d)):
+            e.append(a*d[i] + (1-a)*e[-1])
+        return e
+    fast = ema(p, 12)
+    slow = ema(p, 26)
+    macd = [f-s for f,s in zip(fast, slow)]
+    sig = ema(macd, 9)
+    return round(macd[-1], 4), round(sig[-1], 4), round(macd[-1]-sig[-1], 4)
+
+def calc_kdj(p, n=9):
+    """KDJ(n,3,3)：K、D为RSV、K的1/3平滑，初值50；需要从头递推，取 kdj_series 的最后一个值"""
+    if len(p) < n: return 50, 50, 50
+    k, d, j = kdj_series(p, n)
+    return round(float(k[-1]), 1), round(float(d[-1]), 1), round(float(j[-1]), 1)
+
+def calc_ma(p, n):
+    return round(np.mean(p[-n:]), 2) if len(p) >= n else (round(p[-1], 2) if p else 0)
+
+def calc_boll(p, n=20):
+    if len(p) < n: return 0, 0, 0
+    mid = np.mean(p[-n:])
+    std = np.std(p[-n:])
+    return round(mid+2*std, 2), round(mid, 2), round(mid-2*std, 2)
+
+def calc_sr(p, n=15):
+    if len(p) < n: return (round(min(p),2), round(max(p),2)) if p else (0,0)
+    return round(min(p[-n:]), 2), round(max(p[-n:]), 2)
+
+def calc_volume_ratio(v, n=10):
+    if len(v) < n+1: return 1.0
+    return round(v[-1] / (np.mean(v[-n-1:-1]) + 1e-9), 2)
+
+def detect_pattern(p):
+    if len(p) < 15: return "数据不足"
+    r = p[-15:]
+    mi, ma = np.argmin(r), np.argmax(r)
+    s, l, h, c = r[0], r[mi], r[ma], r[-1]
+    if 2 < mi < 12 and (s-l)/s > 0.01 and (c-l)/l > 0.008: return "V型反转"
+    if 2 < ma < 12 and (h-s)/s > 0.01 and (h-c)/h > 0.008: return "倒V型"
+    if (h-l)/l < 0.015: return "箱体震荡"
+    return "趋势运行"
+
+def predict_trend(p, ma5, ma10):
+    """简单趋势预测"""
+    if len(p) < 10: return "数据不足", 0
+    current = p[-1]
+    if ma5 > ma10 and current > ma5:
+        return "上涨趋势", 1
+    elif ma5 < ma10 and current < ma5:
+        return "下跌趋势", -1
+    else:
+        return "震荡整理", 0
+
+# 评分权重: *_cut 为分档阈值（由严到宽），*_pts 为对应加分；pos_pts 第三项为高于最后一档时的加分
+SCORE_PARAMS = {
+    'rsi_cut': (30, 40, 50), 'rsi_pts': (25, 18, 8),
+    'pos_cut': (0.2, 0.4), 'pos_pts': (20, 12, 4),
+    'v_pts': 20, 'box_pts': 8,
+    'k_cut': (20, 30), 'k_pts': (15, 10),
+    'vol_cut': (0.7, 1.0), 'vol_pts': (10, 5),
+    'time_pts': 10,  # 9:45-10:30、13:30-14:30
+}
+
+def _in_time_window(h):
+    return 9.75 <= h <= 10.5 or 13.5 <= h <= 14.5
+
+def calc_score(price, sup, res, rsi, pat, k, vol_ratio, now=None, w=None):
+    """now为评分时刻，默认当前时间（回放时传入记录时间）；w为评分权重，默认 SCORE_PARAMS"""
+    w = w or SCORE_PARAMS
+    s = 0
+    for c, pt in zip(w['rsi_cut'], w['rsi_pts']):
+        if rsi < c: s += pt; break
+    if res > sup:
+        pos = (price - sup) / (res - sup)
+        s += next((pt for c, pt in zip(w['pos_cut'], w['pos_pts']) if pos <= c), w['pos_pts'][-1])
+    if 'V型' in pat: s += w['v_pts']
+    elif '箱体' in pat: s += w['box_pts']
+    for c, pt in zip(w['k_cut'], w['k_pts']):
+        if k < c: s += pt; break
+    for c, pt in zip(w['vol_cut'], w['vol_pts']):
+        if vol_ratio < c: s += pt; break
+    now = now or datetime.now()
+    if _in_time_window(now.hour + now.minute / 60): s += w['time_pts']
+    return min(s, 100)
+
+# ==================== 指标序列 ====================
+# 以下函数返回整条序列，沿最后一维计算，可直接传入 (股票, 时间) 二维数组；
+# 数据不足窗口的位置为NaN，最后一个有效值与对应的 calc_* 一致（未取整）
+
+def ema_series(x, n):
+    """EMA序列，以第一个值为初值，与 calc_macd 内的ema相同
+
+    分块递推: 块内 y_j = b^j * (y0 + a * cumsum(x_k * b^-k))，块间只传递最后一个值，
+    块长按 b^-L <= 1e30 选取，避免溢出和精度损失
+    """
+    x = np.asarray(x, dtype=np.float64)
+    a = 2 / (n + 1)
+    b = 1 - a
+    out = np.empty_like(x)
+    T = x.shape[-1]
+    if T == 0:
+        return out
+    if b <= 0:
+        out[...] = x
+        return out
+    L = max(1, min(256, int(30 / -math.log10(b))))
+    pw = b ** np.arange(1, L + 1)
+    y = out[..., 0] = x[..., 0]
+    for s in range(1, T, L):
+        seg = x[..., s:s+L]
+        k = seg.shape[-1]
+        out[..., s:s+k] = pw[:k] * (y[..., None] + a * np.cumsum(seg / pw[:k], axis=-1))
+        y = out[..., s+k-1]
+    return out
+
+def _rolling_sum(x, n):
+    """长度为n的滚动和，前n-1个位置为NaN"""
+    c = np.cumsum(x, axis=-1)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= n:
+        out[..., n-1] = c[..., n-1]
+        out[..., n:] = c[..., n:] - c[..., :-n]
+    return out
+
+def _windows(x, n):
+    return np.lib.stride_tricks.sliding_window_view(x, n, axis=-1)
+
+def macd_series(p):
+    """(macd, signal, hist) 三条序列，与 calc_macd 口径一致"""
+    p = np.asarray(p, dtype=np.float64)
+    macd = ema_series(p, 12) - ema_series(p, 26)
+    sig = ema_series(macd, 9)
+    return macd, sig, macd - sig
+
+def rsi_series(p, n=14):
+    """RSI序列：最近n个涨跌的平均涨幅/平均跌幅，与 calc_rsi 口径一致"""
+    p = np.asarray(p, dtype=np.float64)
+    out = np.full(p.shape, np.nan)
+    if p.shape[-1] <= n:
+        return out
+    d = np.diff(p, axis=-1)
+    g = _rolling_sum(np.maximum(d, 0), n)[..., n-1:] / n
+    l = _rolling_sum(np.maximum(-d, 0), n)[..., n-1:] / n
+    out[..., n:] = 100 - 100 / (1 + g / (l + 1e-9))
+    return out
+
+def _smooth3(x):
+    """K/D平滑: y = 2/3*y_prev + 1/3*x，初值50；即以50为首值的 ema_series(n=5)"""
+    x = np.concatenate([np.full(x.shape[:-1] + (1,), 50.0), x], axis=-1)
+    return ema_series(x, 5)[..., 1:]
+
+def kdj_series(p, n=9):
+    """(K, D, J) 三条序列：RSV为n周期最高/最低价位置，K、D各做1/3平滑，J = 3K - 2D"""
+    p = np.asarray(p, dtype=np.float64)
+    k = np.full(p.shape, np.nan)
+    d = k.copy()
+    if p.shape[-1] >= n:
+        w = _windows(p, n)
+        lo, hi = w.min(axis=-1), w.max(axis=-1)
+        rng = hi - lo
+        rsv = np.where(rng == 0, 50.0, (p[..., n-1:] - lo) / np.where(rng == 0, 1, rng) * 100)
+        k[..., n-1:] = _smooth3(rsv)
+        d[..., n-1:] = _smooth3(k[..., n-1:])
+    return k, d, 3*k - 2*d
+
+def ma_series(p, n):
+    """n周期均线序列"""
+    p = np.asarray(p, dtype=np.float64)
+    base = p[..., :1] if p.shape[-1] else 0
+    return _rolling_sum(p - base, n) / n + base
+
+def boll_series(p, n=20):
+    """(上轨, 中轨, 下轨) 三条序列，标准差为总体标准差，与 calc_boll 一致"""
+    p = np.asarray(p, dtype=np.float64)
+    base = p[..., :1] if p.shape[-1] else 0
+    x = p - base
+    mean = _rolling_sum(x, n) / n
+    var = np.maximum(_rolling_sum(x * x, n) / n - mean * mean, 0)
+    std = np.sqrt(var)
+    mid = mean + base
+    return mid + 2*std, mid, mid - 2*std
+
+# ==================== 批量评分 ====================
+def score_from_features(f, w=None):
+    """calc_score 的加分规则；f 为 score_features 格式的特征，各项同形状数组"""
+    w = w or SCORE_PARAMS
+    s = np.select([f['rsi'] < c for c in w['rsi_cut']], w['rsi_pts'], 0)
+    pos = f['pos']
+    s += np.where(f['sr_ok'], np.select([pos <= c for c in w['pos_cut']], w['pos_pts'][:-1], w['pos_pts'][-1]), 0)
+    s += np.where(f['v_flag'], w['v_pts'], np.where(f['box'], w['box_pts'], 0))
+    s += np.select([f['k'] < c for c in w['k_cut']], w['k_pts'], 0)
+    s += np.select([f['vol_r'] < c for c in w['vol_cut']], w['vol_pts'], 0)
+    s += np.where(f['in_time'], w['time_pts'], 0)
+    return np.minimum(s, 100)
+
+def _pattern_flags(r):
+    """r 最后一维为15根K线的窗口，返回 (V型或倒V型, 箱体)，同 detect_pattern / calc_score"""
+    mi, ma = r.argmin(axis=-1), r.argmax(axis=-1)
+    st, lo, hi, c = r[..., 0], r.min(axis=-1), r.max(axis=-1), r[..., -1]
+    v_rev = (2 < mi) & (mi < 12) & ((st-lo)/st > 0.01) & ((c-lo)/lo > 0.008)
+    inv_v = (2 < ma) & (ma < 12) & ((hi-st)/st > 0.01) & ((hi-c)/hi > 0.008)
+    box = ~v_rev & ~inv_v & ((hi-lo)/lo < 0.015)
+    return v_rev | inv_v, box  # calc_score 中 'V型' 同时匹配 '倒V型'
+
+def score_matrix(p, v, price, now=None, w=None):
+    """(股票, 时间) 矩阵一次算出所有股票的评分，与逐只调用 calc_score 口径一致
+
+    p/v 为等长的价格、成交量矩阵，price 为各股票最新价；返回int评分向量
+    """
+    p = np.asarray(p, dtype=np.float64)
+    v = np.asarray(v, dtype=np.float64)
+    price = np.asarray(price, dtype=np.float64)
+    S, T = p.shape
+    now = now or datetime.now()
+    f = {'rsi': np.full(S, 50.0), 'sr_ok': np.zeros(S, dtype=bool), 'pos': np.zeros(S),
+         'v_flag': np.zeros(S, dtype=bool), 'box': np.zeros(S, dtype=bool), 'k': np.full(S, 50.0),
+         'vol_r': np.ones(S), 'in_time': _in_time_window(now.hour + now.minute / 60)}
+    if T:
+        r = p[:, -15:]
+        sup, res = np.round(r.min(axis=1), 2), np.round(r.max(axis=1), 2)
+        f['sr_ok'] = ok = res > sup
+        f['pos'] = (price - sup) / np.where(ok, res - sup, 1)
+    if T >= 15:
+        f['rsi'] = np.round(rsi_series(r)[:, -1], 1)
+        f['v_flag'], f['box'] = _pattern_flags(r)
+    if T >= 9:
+        f['k'] = np.round(kdj_series(p)[0][:, -1], 1)
+    if T >= 11:
+        f['vol_r'] = np.round(v[:, -1] / (v[:, -11:-1].mean(axis=1) + 1e-9), 2)
+    return score_from_features(f, w)
+
+def score_features(p, v, t):
+    """每根K线收盘时的评分特征（价格取当根收盘价），沿最后一维计算；与权重无关，可复用于不同参数"""
+    p = np.asarray(p, dtype=np.float64)
+    v = np.asarray(v, dtype=np.float64)
+    t = np.asarray(t)
+    T = p.shape[-1]
+    f = {'rsi': np.nan_to_num(np.round(rsi_series(p), 1), nan=50.0)}
+    # 支撑/压力: 不足15根时取全部
+    sup, res = np.minimum.accumulate(p, axis=-1), np.maximum.accumulate(p, axis=-1)
+    f['v_flag'] = np.zeros(p.shape, dtype=bool)
+    f['box'] = f['v_flag'].copy()
+    if T >= 15:
+        win = _windows(p, 15)
+        sup[..., 14:], res[..., 14:] = win.min(axis=-1), win.max(axis=-1)
+        f['v_flag'][..., 14:], f['box'][..., 14:] = _pattern_flags(win)
+    sup, res = np.round(sup, 2), np.round(res, 2)
+    f['sr_ok'] = ok = res > sup
+    f['pos'] = (p - sup) / np.where(ok, res - sup, 1)
+    f['k'] = np.nan_to_num(np.round(kdj_series(p)[0], 1), nan=50.0) if T else np.full(p.shape, 50.0)
+    f['vol_r'] = np.ones(p.shape)
+    if T >= 11:
+        prev = _rolling_sum(v, 10)[..., 9:-1] / 10
+        f['vol_r'][..., 10:] = np.round(v[..., 10:] / (prev + 1e-9), 2)
+    h = t // 100 + t % 100 / 60
+    f['in_time'] = ((9.75 <= h) & (h <= 10.5)) | ((13.5 <= h) & (h <= 14.5))
+    return f
+
+def score_series(p, v, t, w=None):
+    """评分序列：第i个值等于对 p[..., :i+1] 调用 calc_score（价格取当根收盘价）"""
+    return score_from_features(score_features(p, v, t), w)
+
+def score_batch(prices, volumes, price, now=None, w=None):
+    """多只股票的分时序列（长度可不同）批量评分，按长度分组各做一次 score_matrix；返回评分列表
+
+    同一交易日的自选股分钟数通常相同，一般只有一组。
+    """
+    out = [0] * len(prices)
+    groups = {}
+    for i, x in enumerate(prices):
+        groups.setdefault(len(x), []).append(i)
+    for idx in groups.values():
+        sc = score_matrix(np.stack([prices[i] for i in idx]), np.stack([volumes[i] for i in idx]),
+                          [price[i] for i in idx], now, w)
+        for i, x in zip(idx, sc.tolist()):
+            out[i] = x
+    return out
+
+# ==================== 增量指标 ====================
+MA_WINDOWS = (5, 10, 20, 60)  # IndicatorState 默认维护的均线周期，可按需增减
+
+
+class _RollingExtreme:
+    """滑动窗口最小/最大值：单调队列，每次更新均摊O(1)"""
+
+    def __init__(self, n, cmp):
+        self.n = n
+        self.cmp = cmp  # cmp(a, b) 为真时 b 被 a 淘汰
+        self.q = collections.deque()  # (序号, 值)
+
+    def push(self, i, x):
+        q = self.q
+        while q and self.cmp(x, q[-1][1]):
+            q.pop()
+        q.append((i, x))
+        while q[0][0] <= i - self.n:
+            q.popleft()
+
+    @property
+    def value(self):
+        return self.q[0][1]
+
+
+class RollingWindow:
+    """长度为n的滑动窗口：滚动和、平方和，extremes=True时另维护窗口最小/最大值
+
+    均线、布林带、量比、支撑/压力位共用，每根新K线O(1)更新。
+    """
+
+    def __init__(self, n, extremes=False):
+        self.n = n
+        self.buf = collections.deque(maxlen=n)
+        self.count = 0
+        self.sum = self.sq = 0.0
+        self._low = _RollingExtreme(n, lambda a, b: a <= b) if extremes else None
+        self._high = _RollingExtreme(n, lambda a, b: a >= b) if extremes else None
+
+    def push(self, x):
+        buf = self.buf
+        if len(buf) == self.n:
+            old = buf[0]
+            self.sum -= old
+            self.sq -= old * old
+        buf.append(x)
+        self.sum += x
+        self.sq += x * x
+        if self._low:
+            self._low.push(self.count, x)
+            self._high.push(self.count, x)
+        self.count += 1
+
+    @property
+    def full(self):
+        return self.count >= self.n
+
+    @property
+    def mean(self):
+        return self.sum / len(self.buf)
+
+    @property
+    def std(self):
+        """总体标准差"""
+        m = self.mean
+        return math.sqrt(max(self.sq / len(self.buf) - m * m, 0))
+
+    @property
+    def low(self):
+        return self._low.value
+
+    @property
+    def high(self):
+        return self._high.value
+
+
+class IndicatorState:
+    """单只股票的增量指标状态，每根新K线O(1)更新
+
+    计算口径与 calc_rsi / calc_macd / calc_kdj / calc_ma / calc_boll / calc_sr /
+    calc_volume_ratio / detect_pattern 一致，可替代每次对整段价格重新计算。
+    价格窗口按周期共用：ma_windows 中的均线、BOLL(20)、KDJ(9)、支撑/压力(15)
+    周期相同的只维护一个 RollingWindow，增加 MA60 等只多一个窗口的O(1)更新。
+    """
+
+    def __init__(self, ma_windows=MA_WINDOWS):
+        self.ma_windows = tuple(sorted(set(ma_windows) | {5, 10}))  # 趋势判断需要MA5/MA10
+        self.lock = threading.Lock()
+        self.rev = 0  # 每次 sync 有变化时递增，AnalysisCache 据此判断结果是否过期
+        self.reset()
+
+    def reset(self, date=''):
+        self.date = date
+        self.n = 0
+        self.price = 0.0
+        self.volume = 0.0
+        self.ema12 = self.ema26 = self.dea = 0.0
+        self.diffs = collections.deque(maxlen=14)
+        self.gain = self.loss = 0.0
+        self.k = self.d = 50.0
+        sizes = set(self.ma_windows) | {9, 15, 20}
+        self.win = {n: RollingWindow(n, extremes=n in (9, 15)) for n in sorted(sizes)}
+        self.vwin = RollingWindow(10)  # 前10根成交量（不含当前）
+        self._tail = None  # 推入最后一根K线之前的状态快照
+
+    def push(self, price, volume=0.0):
+        i = self.n
+        # MACD: EMA以第一根价格为初值
+        if i == 0:
+            self.ema12 = self.ema26 = price
+            self.dea = 0.0
+        else:
+            self.ema12 += (price - self.ema12) * 2 / 13
+            self.ema26 += (price - self.ema26) * 2 / 27
+            self.dea += (self.ema12 - self.ema26 - self.dea) * 2 / 10
+            # RSI: 最近14个涨跌的滚动和
+            d = price - self.price
+            if len(self.diffs) == 14:
+                old = self.diffs[0]
+                self.gain -= max(old, 0)
+                self.loss -= max(-old, 0)
+            self.diffs.append(d)
+            self.gain += max(d, 0)
+            self.loss += max(-d, 0)
+            self.vwin.push(self.volume)
+        for w in self.win.values():
+            w.push(price)
+        # KDJ: 满9根后RSV参与平滑
+        if i >= 8:
+            w9 = self.win[9]
+            lo, hi = w9.low, w9.high
+            rsv = 50 if hi == lo else (price - lo) / (hi - lo) * 100
+            self.k += (rsv - self.k) / 3
+            self.d += (self.k - self.d) / 3
+        self.price = price
+        self.volume = volume
+        self.n = i + 1
+
+    def _snapshot(self):
+        return {k: copy.deepcopy(v) for k, v in self.__dict__.items() if k not in ('lock', 'rev', '_tail')}
+
+    def sync(self, series):
+        """追上 MinuteSeries 的新数据；换日或数据被重置时从头计算。返回重新计算的条数
+
+        最后一根K线在该分钟结束前会被改写：推入最后一根前保存快照，它变化时回退到快照重算这一根。
+        """
+        with self.lock:
+            with series.lock:
+                if series.date != self.date or series.n < self.n:
+                    self.reset(series.date)
+                elif self.n and (series.prices[self.n-1] != self.price or series.volumes[self.n-1] != self.volume):
+                    if self._tail is None:
+                        self.reset(series.date)
+                    else:
+                        self.__dict__.update(self._tail)
+                start = self.n
+                p = series.prices[start:].tolist()
+                v = series.volumes[start:].tolist()
+            if p:
+                for price, vol in zip(p[:-1], v[:-1]):
+                    self.push(price, vol)
+                self._tail = self._snapshot()
+                self.push(p[-1], v[-1])
+                self.rev += 1
+            return len(p)
+
+    # ---------- 读取（与calc_*返回值一致） ----------
+    def rsi(self):
+        if self.n < 15: return 50
+        return round(100 - 100 / (1 + (self.gain / 14) / (max(self.loss, 0) / 14 + 1e-9)), 1)
+
+    def macd(self):
+        if self.n < 26: return 0, 0, 0
+        m = self.ema12 - self.ema26
+        return round(m, 4), round(self.dea, 4), round(m - self.dea, 4)
+
+    def kdj(self):
+        if self.n < 9: return 50, 50, 50
+        return round(self.k, 1), round(self.d, 1), round(3*self.k - 2*self.d, 1)
+
+    def ma(self, n):
+        """n须在 ma_windows 中"""
+        w = self.win[n]
+        return round(w.mean, 2) if w.full else (round(self.price, 2) if self.n else 0)
+
+    def boll(self):
+        w = self.win[20]
+        if not w.full: return 0, 0, 0
+        mid, std = w.mean, w.std
+        return round(mid+2*std, 2), round(mid, 2), round(mid-2*std, 2)
+
+    def sr(self):
+        if not self.n: return 0, 0
+        w = self.win[15]
+        return round(w.low, 2), round(w.high, 2)
+
+    def volume_ratio(self):
+        if not self.vwin.full: return 1.0
+        return round(self.volume / (self.vwin.mean + 1e-9), 2)
+
+    def pattern(self):
+        w = self.win[15]
+        return detect_pattern(list(w.buf)) if w.full else "数据不足"
+
+    def trend(self):
+        return predict_trend(list(self.win[10].buf), self.ma(5), self.ma(10))
+
+    def score(self, price, now=None, w=None):
+        sup, res = self.sr()
+        return calc_score(price, sup, res, self.rsi(), self.pattern(), self.kdj()[0], self.volume_ratio(), now, w)
+
+    def analysis(self):
+        """当前K线的全部读数，调用方需持有 self.lock"""
+        return Analysis(self.date, self.n, self.rsi(), self.macd(), self.kdj(), self.ma(5), self.boll(),
+                        self.sr(), self.volume_ratio(), self.pattern(), self.trend()[0])
+
+
+class Analysis(collections.namedtuple('Analysis', 'date n rsi macd kdj ma5 boll sr volume_ratio pattern trend')):
+    """某只股票截至第n根K线的指标结果（只读，可在线程间共享）"""
+    __slots__ = ()
+
+    def score(self, price, now=None, w=None):
+        """评分依赖实时价格和时刻，不缓存"""
+        sup, res = self.sr
+        return calc_score(price, sup, res, self.rsi, self.pattern, self.kdj[0], self.volume_ratio, now, w)
+
+
+class AnalysisCache:
+    """按股票缓存 Analysis，LRU淘汰；IndicatorState 没有变化（rev相同）时直接复用上次结果"""
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()  # code -> (IndicatorState, rev, Analysis)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, code, state):
+        with state.lock:
+            with self._lock:
+                e = self._data.get(code)
+                if e is not None and e[0] is state and e[1] == state.rev:
+                    self._data.move_to_end(code)
+                    self.hits += 1
+                    return e[2]
+                self.misses += 1
+            a, rev = state.analysis(), state.rev
+        with self._lock:
+            self._data[code] = (state, rev, a)
+            self._data.move_to_end(code)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return a
+
+
+def sync_state(states, code, series):
+    """取 states[code] 并追上 series 的新数据"""
+    st = states.get(code) or states.setdefault(code, IndicatorState())
+    st.sync(series)
+    return st
+
+
+def analyze(states, cache, code, series):
+    """sync_state 后从 cache 取该股票当前K线的 Analysis"""
+    return cache.get(code, sync_state(states, code, series))
@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+"""
+行情数据层 - 不依赖Kivy
+腾讯行情接口(qt.gtimg.cn / data.gtimg.cn)的请求与解析
+"""
+
+import random
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+# ==================== HTTP客户端 ====================
+class QuoteClient:
+    """共享HTTP客户端：每个主机一个连接池Session(keep-alive)，限制并发，抖动退避重试"""
+
+    def __init__(self, max_concurrency=4, retries=2, timeout=5, deadline=8, backoff=0.3):
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.timeout = timeout      # 单次请求超时
+        self.deadline = deadline    # 含重试在内的总时限
+        self.backoff = backoff      # 退避基数（秒）
+        self.sessions = {}
+        self.recorder = None        # 设置后每个成功响应都交给 recorder.write(url, body) 记录
+        self._lock = threading.Lock()
+        self._sem = threading.BoundedSemaphore(max_concurrency)
+
+    def _session(self, host):
+        with self._lock:
+            s = self.sessions.get(host)
+            if s is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+                s.mount('http://', adapter)
+                s.mount('https://', adapter)
+                s.headers['Connection'] = 'keep-alive'
+                self.sessions[host] = s
+            return s
+
+    def get(self, url, deadline=None):
+        """GET请求，连接失败/超时/5xx时重试，超过deadline抛出异常"""
+        session = self._session(urlsplit(url).netloc)
+        end = time.monotonic() + (deadline or self.deadline)
+        err = None
+        for attempt in range(self.retries + 1):
+            left = end - time.monotonic()
+            if left <= 0 or not self._sem.acquire(timeout=left):
+                break
+            try:
+                r = session.get(url, timeout=min(self.timeout, max(end - time.monotonic(), 0.1)))
+                if r.status_code < 500:
+                    if self.recorder:
+                        self.recorder.write(url, r.content)
+                    return r
+                err = requests.HTTPError(f'{r.status_code} {url}', response=r)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                err = e
+            finally:
+                self._sem.release()
+            if attempt < self.retries:
+                # full jitter: 在[0, backoff*2^n]内随机等待，避免多个请求同时重试
+                delay = random.uniform(0, self.backoff * 2 ** attempt)
+                if time.monotonic() + delay >= end:
+                    break
+                time.sleep(delay)
+        raise err or requests.Timeout(f'deadline exceeded: {url}')
+
+    def close(self):
+        with self._lock:
+            for s in self.sessions.values():
+                s.close()
+            self.sessions = {}
+
+CLIENT = QuoteClient()
+
+# ==================== API ====================
+QUOTE_BATCH = 60  # 单次请求合并的股票数上限（受URL长度限制）
+
+def _symbol(code):
+    return f"sh{code}" if code.startswith('6') else f"sz{code}"
+
+def _parse_quote(code, p):
+    """解析按~切分后的行情字段"""
+    if len(p) > 40:
+        return {
+            'name': p[1], 'code': code,
+            'price': float(p[3] or 0),
+            'change': float(p[32] or 0),
+            'open': float(p[5] or 0),
+            'high': float(p[33] or 0),
+            'low': float(p[34] or 0),
+            'volume': float(p[6] or 0),
+        }
+    return None
+
+# 批量行情的结构化数组，字段与 _parse_quote 返回的dict一致
+QUOTE_DTYPE = np.dtype([
+    ('code', 'U6'), ('name', 'U16'), ('price', 'f8'), ('change', 'f8'),
+    ('open', 'f8'), ('high', 'f8'), ('low', 'f8'), ('volume', 'f8'),
+])
+_QUOTE_NUM = (('price', 3), ('change', 32), ('open', 5), ('high', 33), ('low', 34), ('volume', 6))
+_NL, _TILDE = ord('\n'), ord('~')
+
+def parse_quotes_raw(raw, out=None):
+    """直接在原始bytes上解析批量行情，写入结构化数组并返回 out[:n]
+
+    用numpy一次定位所有换行和~的位置，每只股票只切出需要的6个数值字段和代码，
+    名称字段单独按GBK解码，不再把整段响应解码成str再切成几十个字符串。
+    out 可传入预分配的 QUOTE_DTYPE 数组重复使用。
+    """
+    buf = np.frombuffer(raw, dtype=np.uint8)
+    tildes = np.flatnonzero(buf == _TILDE)
+    ends = np.flatnonzero(buf == _NL)
+    if not len(ends) or ends[-1] != len(buf) - 1:
+        ends = np.append(ends, len(buf))
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    first = np.searchsorted(tildes, starts)
+    count = np.searchsorted(tildes, ends) - first
+    first = first[count >= 40]  # 与 _parse_quote 的 len(p) > 40 一致
+    # 第j个字段位于 tildes[f+j-1]+1 .. tildes[f+j]
+    lo = lambda j, f=first: tildes[f + j - 1] + 1
+    hi = lambda j, f=first: tildes[f + j]
+    # 代码字段必须是6位数字；GBK名称的尾字节可能恰好是0x7E('~')，此时字段错位，退回按str解析
+    a2 = lo(2)
+    digits = buf[np.minimum(a2[:, None] + np.arange(6), len(buf) - 1)]
+    good = (hi(2) - a2 == 6) & ((digits >= 48) & (digits <= 57)).all(axis=1)
+    f = first[good]
+    # 数值字段转换失败（停牌的'-'、截断的行等）的行同样退回逐行解析，只丢掉这一行
+    nums = [_floats(raw, lo(j, f).tolist(), hi(j, f).tolist()) for _, j in _QUOTE_NUM]
+    ok = np.ones(len(f), dtype=bool)
+    for col in nums:
+        if None in col:
+            ok &= np.array([x is not None for x in col], dtype=bool)
+    bad = [_parse_line(raw, starts, ends, s) for s in lo(1)[~good].tolist() + lo(1, f)[~ok].tolist()]
+    bad = [q for q in bad if q]
+    if not ok.all():
+        keep = np.flatnonzero(ok).tolist()
+        nums = [[col[i] for i in keep] for col in nums]
+        f = f[ok]
+    m = len(f)
+    n = m + len(bad)
+    if out is None or len(out) < n:
+        out = np.zeros(n, dtype=QUOTE_DTYPE)
+    out['code'][:m] = [raw[a:b].decode('ascii') for a, b in zip(lo(2, f).tolist(), hi(2, f).tolist())]
+    out['name'][:m] = [raw[a:b].decode('gbk', 'replace') for a, b in zip(lo(1, f).tolist(), hi(1, f).tolist())]
+    for (name, _), col in zip(_QUOTE_NUM, nums):
+        out[name][:m] = col
+    for k, q in enumerate(bad, m):
+        out[k] = tuple(q[name] for name in QUOTE_DTYPE.names)
+    return out[:n]
+
+def _floats(raw, a, b):
+    """raw[a[i]:b[i]] 逐个转换为float（空字段为0），无法转换的为None"""
+    try:
+        return [float(raw[x:y] or 0) for x, y in zip(a, b)]
+    except ValueError:
+        out = []
+        for x, y in zip(a, b):
+            try:
+                out.append(float(raw[x:y] or 0))
+            except ValueError:
+                out.append(None)
+        return out
+
+def _parse_line(raw, starts, ends, pos):
+    """按旧方式解析pos所在的一行"""
+    i = np.searchsorted(starts, pos, 'right') - 1
+    try:
+        p = raw[starts[i]:ends[i]].decode('gbk').split('~')
+        return _parse_quote(p[2], p)
+    except:
+        return None
+
+def fetch_quote(code):
+    try:
+        r = CLIENT.get(f'http://qt.gtimg.cn/q={_symbol(code)}')
+        r.encoding = 'gbk'
+        if 'v_' in r.text:
+            return _parse_quote(code, r.text.split('~'))
+    except:
+        pass
+    return None
+
+def fetch_quotes(codes):
+    """批量获取行情: q=sh600586,sz000001,... 一次请求返回多只股票，结果为 {code: quote}"""
+    codes = list(dict.fromkeys(codes))
+    out = {}
+    for i in range(0, len(codes), QUOTE_BATCH):
+        chunk = set(codes[i:i+QUOTE_BATCH])
+        try:
+            r = CLIENT.get('http://qt.gtimg.cn/q=' + ','.join(_symbol(c) for c in chunk))
+        except:
+            continue  # 请求失败只影响这一批
+        # 格式异常的行在 parse_quotes_raw 内逐行处理，不会连累同一批的其它股票
+        for row in parse_quotes_raw(r.content).tolist():
+            if row[0] in chunk:
+                out[row[0]] = dict(zip(QUOTE_DTYPE.names, row))
+    return out
+
+# ==================== 分时解析 ====================
+_BSLASH = ord('\\')
+# 只保留数字、小数点和负号，其余字节（'\\n\\'分隔符、换行、结尾的'";'）都变成空格
+_NUM_TABLE = bytes(c if (48 <= c <= 57 or c in (45, 46)) else 32 for c in range(256))
+
+def _parse_minute_rows(rows, after=-1):
+    """解析 'HHMM 价格 成交量' 行，只保留时间晚于after的分钟"""
+    t, p, v = [], [], []
+    for line in rows:
+        parts = line.strip().split(' ')
+        if len(parts) >= 3:
+            try:
+                hm = int(parts[0])
+                if hm <= after:
+                    continue
+                price, vol = float(parts[1]), float(parts[2])
+            except:
+                continue
+            t.append(hm)
+            p.append(price)
+            v.append(vol)
+    return t, p, v
+
+def parse_minute_raw(raw, skip=0, after=-1):
+    """向量化解析分时文件原始bytes，返回 (date, times, prices, volumes)，均为numpy数组
+
+    文件格式: min_data="\\n\\ date:YYMMDD\\n\\ HHMM 价格 成交量\\n\\ ... ";
+    用translate把行分隔符换成空格后整段交给 np.fromstring 一次转换。skip>0 时若第skip行的时间等于after，
+    则直接跳过前skip行（增量追加时只转换新行）；只返回时间晚于after的分钟。
+    """
+    bs = np.flatnonzero(np.frombuffer(raw, dtype=np.uint8) == _BSLASH)
+    starts, ends = bs[0::2], bs[1::2] + 1  # 每个'\\n\\'分隔符的起止位置
+    if len(ends) < 2:
+        return '', np.zeros(0, np.int32), np.zeros(0), np.zeros(0)
+    head = raw[ends[0]:starts[1]].strip()
+    date = head[5:].decode('ascii', 'replace') if head.startswith(b'date:') else ''
+    first = 1 if date else 0  # 第一行数据前的分隔符序号
+    if skip and not (first + skip < len(ends) and
+                     raw[ends[first+skip-1]:starts[first+skip]].strip().startswith(b'%04d ' % after)):
+        skip = 0
+    body = raw[ends[first+skip]:] if first + skip < len(ends) else b''
+    rows = len(starts) - first - skip - 1  # 分隔符之间的完整行
+    tail = body[body.rfind(b'\\n\\') + 3:].strip() if rows else body.strip()
+    if tail and tail != b'";':
+        rows += 1
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        try:
+            vals = np.fromstring(body.translate(_NUM_TABLE), dtype=np.float64, sep=' ')
+        except ValueError:  # 新版numpy遇到无法转换的内容（如单独的'-'）直接报错，旧版只警告并截断
+            vals = np.zeros(0)
+    if len(vals) == rows * 3:
+        vals = vals.reshape(-1, 3)
+        t, p, v = vals[:, 0].astype(np.int32), vals[:, 1], vals[:, 2]
+    else:
+        # 每行字段数不一致或含非数字，退回逐行解析
+        t, p, v = _parse_minute_rows(body.decode('gbk', 'replace').split('\\n\\'), after)
+        t, p, v = np.array(t, dtype=np.int32), np.array(p, dtype=np.float64), np.array(v, dtype=np.float64)
+    if len(t) and t[0] <= after:
+        keep = t > after
+        t, p, v = t[keep], p[keep], v[keep]
+    return date, t, p, v
+
+def fetch_prices(code):
+    """返回当日分时 (prices, volumes) 两个numpy数组"""
+    try:
+        r = CLIENT.get(f'http://data.gtimg.cn/flashdata/hushen/minute/{_symbol(code)}.js')
+        _, _, prices, volumes = parse_minute_raw(r.content)
+        return prices, volumes
+    except:
+        return np.zeros(0), np.zeros(0)
+
+# ==================== 增量分时 ====================
+class MinuteSeries:
+    """单只股票当日分时数据：numpy数组按需扩容，只追加新的分钟"""
+
+    def __init__(self, capacity=256):
+        self.date = ''
+        self.n = 0
+        self.version = 0  # 每次追加/重置递增，供下游判断是否有新数据
+        self._t = np.zeros(capacity, dtype=np.int32)    # HHMM
+        self._p = np.zeros(capacity, dtype=np.float64)
+        self._v = np.zeros(capacity, dtype=np.float64)
+        self.lock = threading.Lock()
+
+    @property
+    def times(self):
+        return self._t[:self.n]
+
+    @property
+    def prices(self):
+        return self._p[:self.n]
+
+    @property
+    def volumes(self):
+        return self._v[:self.n]
+
+    @property
+    def last_time(self):
+        return int(self._t[self.n-1]) if self.n else -1
+
+    def reset(self, date):
+        self.date = date
+        self.n = 0
+        self.version += 1
+
+    def append(self, t, p, v):
+        """追加新分钟；t[0]与已存最后一分钟相同时覆盖该行（该分钟尚未结束，文件会改写最后一行）"""
+        if len(t) and self.n and t[0] == self._t[self.n-1]:
+            i = self.n - 1
+            if self._p[i] != p[0] or self._v[i] != v[0]:
+                self._p[i], self._v[i] = p[0], v[0]
+                self.version += 1
+            t, p, v = t[1:], p[1:], v[1:]
+        k = len(t)
+        if not k:
+            return
+        if self.n + k > len(self._t):
+            cap = max(len(self._t) * 2, self.n + k)
+            for name in ('_t', '_p', '_v'):
+                old = getattr(self, name)
+                new = np.zeros(cap, dtype=old.dtype)
+                new[:self.n] = old[:self.n]
+                setattr(self, name, new)
+        self._t[self.n:self.n+k] = t
+        self._p[self.n:self.n+k] = p
+        self._v[self.n:self.n+k] = v
+        self.n += k
+        self.version += 1
+
+_series_lock = threading.Lock()
+
+def ingest_prices(code, cache, store=None):
+    """拉取分时文件并只追加新分钟到 cache[code]，新交易日自动重置；返回 (series, 更新条数)
+
+    store 为 TickStore 时更新的分钟（含被改写的最后一分钟）同时落盘；请求失败时抛出异常
+    """
+    with _series_lock:
+        s = cache.get(code)
+        if not isinstance(s, MinuteSeries):
+            s = cache[code] = MinuteSeries()
+    raw = CLIENT.get(f'http://data.gtimg.cn/flashdata/hushen/minute/{_symbol(code)}.js').content
+    k = ingest_minute_raw(s, raw)
+    if store is not None and k:
+        with s.lock:
+            # 重启后首次拉取时k为全天，store会跳过已存的分钟、覆盖已存的最后一分钟
+            store.append(code, s.date, s.times[-k:], s.prices[-k:], s.volumes[-k:])
+    return s, k
+
+def ingest_minute_raw(s, raw):
+    """把分时文件原始bytes增量更新到series，返回更新条数（被改写的最后一分钟+新增分钟）"""
+    with s.lock:
+        # 文件按分钟顺序追加，前n-1行不再变化；最后一行在该分钟结束前会被改写，从它开始重新转换
+        prev = int(s._t[s.n-2]) if s.n > 1 else -1
+        date, t, p, v = parse_minute_raw(raw, max(s.n - 1, 0), prev)
+        if not date:
+            return 0
+        if date != s.date:
+            s.reset(date)
+            date, t, p, v = parse_minute_raw(raw)
+        s.append(t, p, v)
+    return len(t)
+
+# ==================== TTL缓存 ====================
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.ts = 0.0
+
+class TTLCache:
+    """按数据类型设置新鲜度TTL的缓存；同一key的并发请求合并为一次(single-flight)
+
+    读取结果都带数据年龄(秒)，便于界面判断/显示数据新旧
+    """
+
+    def __init__(self, ttls):
+        self.ttls = dict(ttls)  # {kind: 秒}
+        self._data = {}         # (kind, key) -> (value, ts)
+        self._inflight = {}     # (kind, key) -> _Flight
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = 0
+
+    def peek(self, kind, key):
+        """不触发请求，返回 (value, age)；无数据时 (None, None)"""
+        e = self._data.get((kind, key))
+        return (e[0], time.monotonic() - e[1]) if e else (None, None)
+
+    def put(self, kind, key, value):
+        with self._lock:
+            self._data[(kind, key)] = (value, time.monotonic())
+
+    def get(self, kind, key, loader):
+        """新鲜数据直接返回，否则调用loader()加载；返回 (value, age)，加载失败时value为None"""
+        return self.get_many(kind, [key], lambda keys: {key: loader()}).get(key, (None, None))
+
+    def get_many(self, kind, keys, loader):
+        """批量读取：过期的key一次性交给loader(keys)->{key: value}；返回 {key: (value, age)}"""
+        ttl = self.ttls[kind]
+        out, mine, waits = {}, [], {}
+        now = time.monotonic()
+        with self._lock:
+            for k in dict.fromkeys(keys):
+                e = self._data.get((kind, k))
+                if e and now - e[1] <= ttl:
+                    out[k] = (e[0], now - e[1])
+                    self.hits += 1
+                elif (kind, k) in self._inflight:
+                    waits[k] = self._inflight[(kind, k)]
+                    self.coalesced += 1
+                else:
+                    self._inflight[(kind, k)] = _Flight()
+                    mine.append(k)
+                    self.misses += 1
+        if mine:
+            got = {}
+            try:
+                got = loader(mine) or {}
+            except:
+                pass
+            finally:
+                ts = time.monotonic()
+                with self._lock:
+                    flights = [(k, self._inflight.pop((kind, k))) for k in mine]
+                    for k, f in flights:
+                        f.value, f.ts = got.get(k), ts
+                        if f.value is not None:
+                            self._data[(kind, k)] = (f.value, ts)
+                for k, f in flights:
+                    f.event.set()
+                    if f.value is not None:
+                        out[k] = (f.value, 0.0)
+        for k, f in waits.items():
+            f.event.wait()
+            if f.value is not None:
+                out[k] = (f.value, time.monotonic() - f.ts)
+        return out
+
+# 行情5秒、分时10秒内视为新鲜（均小于各页面的刷新间隔）
+CACHE = TTLCache({'quote': 5, 'minute': 10})
+
+# 以下函数在拉取失败时不缓存失败结果，而是返回上次成功的数据及其真实年龄，界面据此标注延迟；
+# 从未成功过时为 (None, None)
+
+def _or_stale(kind, key, got):
+    return got if got[0] is not None else CACHE.peek(kind, key)
+
+def get_quote(code):
+    """带缓存的单只行情，返回 (quote, age)"""
+    return _or_stale('quote', code, CACHE.get('quote', code, lambda: fetch_quote(code)))
+
+def get_quotes(codes):
+    """带缓存的批量行情，返回 {code: (quote, age)}"""
+    got = CACHE.get_many('quote', codes, fetch_quotes)
+    return {c: v for c in codes for v in [got.get(c) or CACHE.peek('quote', c)] if v[0] is not None}
+
+def get_prices(code, cache, store=None):
+    """带缓存的增量分时，返回 (MinuteSeries, age)"""
+    return _or_stale('minute', code, CACHE.get('minute', code, lambda: ingest_prices(code, cache, store)[0]))
+
+# 批量拉取分时用的线程池；实际并发仍受 CLIENT 的信号量限制
+_MINUTE_POOL = ThreadPoolExecutor(max_workers=CLIENT.max_concurrency, thread_name_prefix='minute')
+
+def get_prices_many(codes, cache, store=None):
+    """带缓存的批量增量分时，过期的股票并发拉取，返回 {code: (MinuteSeries, age)}"""
+    def load(keys):
+        futs = {c: _MINUTE_POOL.submit(ingest_prices, c, cache, store) for c in keys}
+        out = {}
+        for c, f in futs.items():
+            try:
+                out[c] = f.result()[0]
+            except:
+                pass
+        return out
+    got = CACHE.get_many('minute', codes, load)
+    return {c: v for c in codes for v in [got.get(c) or CACHE.peek('minute', c)] if v[0] is not None}
@@ -5,12 +5,15 @@
 """
 
 import os
+import weakref
 os.environ['KIVY_TEXT'] = 'pil'
 
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.scrollview import ScrollView
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
@@ -23,20 +26,28 @@ from kivy.uix.tabbedpanel import TabbedPanel, TabbedPanelItem
 from kivy.clock import Clock
 from kivy.animation import Animation
 from kivy.properties import ListProperty, StringProperty, NumericProperty, BooleanProperty
-from kivy.graphics import Color, Line, Rectangle, RoundedRectangle, Ellipse
+from kivy.graphics import (Color, Line, Rectangle, RoundedRectangle, Ellipse, InstructionGroup, Mesh,
+                           PushMatrix, PopMatrix, Translate, Scale)
 from kivy.core.text import LabelBase
 from kivy.core.window import Window
 from kivy.core.audio import SoundLoader
 from kivy.metrics import dp, sp
 from kivy.utils import get_color_from_hex, platform
 
-import threading
-import requests
 import numpy as np
 from datetime import datetime
 import csv
 import json
 
+from market_data import CLIENT, get_quote, get_quotes, get_prices, get_prices_many
+from indicators import ma_series, boll_series, macd_series
+from candles import resample, downsample, lod_groups
+from signals import SignalPipeline, signal_display
+from data_engine import DataEngine
+from replay import Recorder
+from tick_store import TickStore
+from state_store import StateJournal
+
 # 自适应窗口
 Window.minimum_width = 320
 Window.minimum_height = 500
@@ -69,167 +80,122 @@ THEMES = {
 
 # 当前主题
 class ThemeManager:
+    """主题调色板
+    
+    各主题的RGBA在启动时算好；THEME.color() 创建的 Color 指令按 (key, alpha) 槽位登记，
+    切换主题时逐槽位原地改 rgba，画布不重建。Color 和监听者都是弱引用，控件销毁后自动移除。
+    """
     def __init__(self):
         self.current = 'dark'
-        self.listeners = []
+        self.palettes = {name: {k: tuple(get_color_from_hex(v)) for k, v in t.items()}
+                         for name, t in THEMES.items()}
+        self.slots = {}       # (key, alpha) -> WeakSet(Color)
+        self.listeners = []   # 弱引用
     
     def get(self, key):
         return THEMES[self.current].get(key, '#ffffff')
     
+    def rgba(self, key, alpha=None):
+        c = self.palettes[self.current].get(key, (1, 1, 1, 1))
+        return c if alpha is None else c[:3] + (alpha,)
+    
+    def color(self, key, alpha=None):
+        """创建跟随主题的 Color 指令（在 with canvas: 中调用即加入该画布）"""
+        c = Color(*self.rgba(key, alpha))
+        self.slots.setdefault((key, alpha), weakref.WeakSet()).add(c)
+        return c
+    
     def toggle(self):
         self.current = 'light' if self.current == 'dark' else 'dark'
-        for fn in self.listeners:
-            fn()
+        for (key, alpha), colors in self.slots.items():
+            rgba = self.rgba(key, alpha)
+            for c in list(colors):
+                c.rgba = rgba
+        alive = []
+        for ref in self.listeners:
+            fn = ref()
+            if fn is not None:
+                fn()
+                alive.append(ref)
+        self.listeners = alive
     
     def add_listener(self, fn):
-        self.listeners.append(fn)
+        """fn 为绑定方法时只保存弱引用，不会让控件常驻内存"""
+        ref = weakref.WeakMethod(fn) if hasattr(fn, '__self__') else (lambda: fn)
+        self.listeners.append(ref)
+    
+    def remove_listener(self, fn):
+        self.listeners = [r for r in self.listeners if r() not in (None, fn)]
 
 THEME = ThemeManager()
 
 # ==================== 全局数据 ====================
+MAX_SIGNALS = 50000  # 历史信号保留条数
+
 class AppData:
     watchlist = ['600586', '000001', '600519', '000858']
-    current = '600586'
+    _current = '600586'
     signals = []
+    signals_version = 0  # signals 每次变化加1，列表据此判断是否需要刷新
     trades = []  # 交易日志
     position = {'hold': 0, 'cost': 0, 'profit': 0}
     stock_cache = {}
-    prices_cache = {}
+    prices_cache = {}  # {code: MinuteSeries} 当日分时，增量追加
+    indicators = {}    # {code: IndicatorState} 增量指标
     # 预警设置
     alerts = {}  # {code: {'high': price, 'low': price}}
     # 设置
     sound_enabled = True
     vibrate_enabled = True
 
-DATA = AppData()
+    @property
+    def current(self):
+        return self._current
 
-# ==================== API ====================
-def fetch_quote(code):
-    try:
-        sym = f"sh{code}" if code.startswith('6') else f"sz{code}"
-        r = requests.get(f'http://qt.gtimg.cn/q={sym}', timeout=5)
-        r.encoding = 'gbk'
-        if 'v_' in r.text:
-            p = r.text.split('~')
-            if len(p) > 40:
-                return {
-                    'name': p[1], 'code': code,
-                    'price': float(p[3] or 0),
-                    'change': float(p[32] or 0),
-                    'open': float(p[5] or 0),
-                    'high': float(p[33] or 0),
-                    'low': float(p[34] or 0),
-                    'volume': float(p[6] or 0),
-                }
-    except:
-        pass
-    return None
-
-def fetch_prices(code):
-    try:
-        sym = f"sh{code}" if code.startswith('6') else f"sz{code}"
-        r = requests.get(f'http://data.gtimg.cn/flashdata/hushen/minute/{sym}.js', timeout=5)
-        prices, volumes = [], []
-        for line in r.text.split('\\n\\')[1:]:
-            parts = line.strip().split(' ')
-            if len(parts) >= 3:
-                try:
-                    prices.append(float(parts[1]))
-                    volumes.append(float(parts[2]))
-                except:
-                    pass
-        return prices, volumes
-    except:
-        return [], []
-
-# ==================== 技术分析 ====================
-def calc_rsi(p, n=14):
-    if len(p) < n+1: return 50
-    d = np.diff(p[-n-1:])
-    return round(100 - 100 / (1 + np.mean(np.maximum(d,0)) / (np.mean(np.maximum(-d,0))+1e-9)), 1)
+    @current.setter
+    def current(self, code):
+        if code != self._current:
+            self._current = code
+            ENGINE.switch(code)  # 取消旧股票的请求
 
-def calc_macd(p):
-    if len(p) < 26: return 0, 0, 0
-    def ema(d, n):
-        a = 2/(n+1)
-        e = [d[0]]
-        for i in range(1, len(d)):
-            e.append(a*d[i] + (1-a)*e[-1])
-        return e
-    fast = ema(p, 12)
-    slow = ema(p, 26)
-    macd = [f-s for f,s in zip(fast, slow)]
-    sig = ema(macd, 9)
-    return round(macd[-1], 4), round(sig[-1], 4), round(macd[-1]-sig[-1], 4)
+DATA = AppData()
 
-def calc_kdj(p, n=9):
-    if len(p) < n: return 50, 50, 50
-    low_n = min(p[-n:])
-    high_n = max(p[-n:])
-    if high_n == low_n:
-        rsv = 50
-    else:
-        rsv = (p[-1] - low_n) / (high_n - low_n) * 100
-    k = rsv  # 简化计算
-    d = k
-    j = 3*k - 2*d
-    return round(k, 1), round(d, 1), round(j, 1)
+# ==================== 状态持久化 ====================
+# 自选/信号/交易/持仓/预警写入追加日志，分时数据按日落盘供多日历史分析。
+# 文件放在 App.user_data_dir 下（Android上当前目录不一定可写、也不持久），由 T0App.build 打开
+PERSISTED = ('watchlist', 'signals', 'trades', 'position', 'alerts')
+STATE = None  # StateJournal
+STORE = None  # TickStore
 
-def calc_ma(p, n):
-    return round(np.mean(p[-n:]), 2) if len(p) >= n else (round(p[-1], 2) if p else 0)
+def open_storage(root):
+    """在root目录下打开状态日志和分时存储，并恢复上次的状态"""
+    global STATE, STORE
+    os.makedirs(root, exist_ok=True)
+    STATE = StateJournal(os.path.join(root, 'state.dat'))
+    for k, v in STATE.load({k: getattr(AppData, k) for k in PERSISTED}).items():
+        setattr(DATA, k, v)
+    STORE = TickStore(os.path.join(root, 'ticks'))
 
-def calc_boll(p, n=20):
-    if len(p) < n: return 0, 0, 0
-    mid = np.mean(p[-n:])
-    std = np.std(p[-n:])
-    return round(mid+2*std, 2), round(mid, 2), round(mid-2*std, 2)
+# ==================== 数据引擎 ====================
+# 所有轮询由引擎线程负责，结果经同一个Clock触发器回到UI线程
+ENGINE = DataEngine(max_concurrency=4, current=lambda: DATA.current)
+ENGINE.notify = Clock.create_trigger(ENGINE.drain)
 
-def calc_sr(p, n=15):
-    if len(p) < n: return (round(min(p),2), round(max(p),2)) if p else (0,0)
-    return round(min(p[-n:]), 2), round(max(p[-n:]), 2)
+PIPELINE = SignalPipeline(states=DATA.indicators)  # 首页、悬浮窗、自选列表共用的评分/信号
 
-def calc_volume_ratio(v, n=10):
-    if len(v) < n+1: return 1.0
-    return round(v[-1] / (np.mean(v[-n-1:-1]) + 1e-9), 2)
+STALE_AGE = 30  # 数据年龄(秒)超过该值时界面标注为延迟（网络失败时缓存返回上次的数据）
 
-def detect_pattern(p):
-    if len(p) < 15: return "数据不足"
-    r = p[-15:]
-    mi, ma = np.argmin(r), np.argmax(r)
-    s, l, h, c = r[0], r[mi], r[ma], r[-1]
-    if 2 < mi < 12 and (s-l)/s > 0.01 and (c-l)/l > 0.008: return "V型反转"
-    if 2 < ma < 12 and (h-s)/s > 0.01 and (h-c)/h > 0.008: return "倒V型"
-    if (h-l)/l < 0.015: return "箱体震荡"
-    return "趋势运行"
+def data_age(*ages):
+    """多份数据中最旧的年龄，没有数据时为None"""
+    ages = [a for a in ages if a is not None]
+    return max(ages) if ages else None
 
-def predict_trend(p, ma5, ma10):
-    """简单趋势预测"""
-    if len(p) < 10: return "数据不足", 0
-    current = p[-1]
-    if ma5 > ma10 and current > ma5:
-        return "上涨趋势", 1
-    elif ma5 < ma10 and current < ma5:
-        return "下跌趋势", -1
-    else:
-        return "震荡整理", 0
+def stale_text(age):
+    return f' 延迟{int(age)}秒' if age is not None and age > STALE_AGE else ''
 
-def calc_score(price, sup, res, rsi, pat, k, vol_ratio):
-    s = 0
-    if rsi < 30: s += 25
-    elif rsi < 40: s += 18
-    elif rsi < 50: s += 8
-    if res > sup:
-        pos = (price - sup) / (res - sup)
-        s += 20 if pos <= 0.2 else (12 if pos <= 0.4 else 4)
-    if 'V型' in pat: s += 20
-    elif '箱体' in pat: s += 8
-    if k < 20: s += 15
-    elif k < 30: s += 10
-    if vol_ratio < 0.7: s += 10
-    elif vol_ratio < 1.0: s += 5
-    h = datetime.now().hour + datetime.now().minute / 60
-    if 9.75 <= h <= 10.5 or 13.5 <= h <= 14.5: s += 10
-    return min(s, 100)
+# 设置环境变量 T0_RECORD=日志路径 时录制所有原始响应，可用 replay.py 离线回放
+if os.environ.get('T0_RECORD'):
+    CLIENT.recorder = Recorder(os.environ['T0_RECORD'])
 
 # ==================== 提醒功能 ====================
 def play_sound():
@@ -290,58 +256,72 @@ def export_trades_csv(filepath='trades_export.csv'):
         return False
 
 # ==================== UI组件 ====================
-class CLabel(Label):
+class Themed:
+    """主题颜色混入: color_key(文字)/bg_key(背景) 为主题颜色key，切换主题时重新取色；
+    为空时不改，直接给 color/background_color 赋值的固定颜色不受主题影响"""
+    color_key = StringProperty('')
+    bg_key = StringProperty('')
+
+    def _init_theme(self):
+        self.bind(color_key=self._apply_theme, bg_key=self._apply_theme)
+        self._apply_theme()
+        THEME.add_listener(self._apply_theme)
+
+    def _apply_theme(self, *a):
+        if self.color_key:
+            self.color = THEME.rgba(self.color_key)
+        if self.bg_key:
+            self.background_color = THEME.rgba(self.bg_key)
+
+class CLabel(Themed, Label):
     def __init__(self, **kw):
+        kw.setdefault('color_key', '' if 'color' in kw else 'text')
         super().__init__(**kw)
         self.font_name = FONT
-        if 'color' not in kw:
-            self.color = get_color_from_hex(THEME.get('text'))
+        self._init_theme()
 
-class CButton(Button):
+class CButton(Themed, Button):
     def __init__(self, **kw):
+        kw.setdefault('bg_key', '' if 'background_color' in kw else 'blue')
         super().__init__(**kw)
         self.font_name = FONT
         self.background_normal = ''
-        if 'background_color' not in kw:
-            self.background_color = get_color_from_hex(THEME.get('blue'))
+        self._init_theme()
 
 class Card(BoxLayout):
     def __init__(self, **kw):
         super().__init__(**kw)
         self.padding = dp(8)
-        self._draw_bg()
+        with self.canvas.before:
+            THEME.color('card')
+            self._bg = RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(10)])
         self.bind(pos=self._draw_bg, size=self._draw_bg)
-        THEME.add_listener(self._draw_bg)
     
     def _draw_bg(self, *a):
-        self.canvas.before.clear()
-        with self.canvas.before:
-            Color(*get_color_from_hex(THEME.get('card')))
-            RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(10)])
+        self._bg.pos, self._bg.size = self.pos, self.size
 
 class InfoBox(BoxLayout):
     def __init__(self, title='', **kw):
         super().__init__(**kw)
         self.orientation = 'vertical'
         self.padding = dp(4)
-        self._draw_bg()
+        with self.canvas.before:
+            THEME.color('card2')
+            self._bg = RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(6)])
         self.bind(pos=self._draw_bg, size=self._draw_bg)
-        THEME.add_listener(self._draw_bg)
         
-        self.title_lbl = CLabel(text=title, font_size=sp(10), color=get_color_from_hex(THEME.get('gray')))
+        self.title_lbl = CLabel(text=title, font_size=sp(10), color_key='gray')
         self.val = CLabel(text='--', font_size=sp(13), bold=True)
         self.add_widget(self.title_lbl)
         self.add_widget(self.val)
     
     def _draw_bg(self, *a):
-        self.canvas.before.clear()
-        with self.canvas.before:
-            Color(*get_color_from_hex(THEME.get('card2')))
-            RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(6)])
+        self._bg.pos, self._bg.size = self.pos, self.size
     
     def set(self, v, c=None):
+        """c 为主题颜色key"""
         self.val.text = str(v)
-        if c: self.val.color = get_color_from_hex(c)
+        if c: self.val.color_key = c
 
 class AnimatedValue(CLabel):
     """带动画的数值Label"""
@@ -360,23 +340,163 @@ class AnimatedValue(CLabel):
         self.text = self.fmt.format(self.target_value)
 
 # ==================== K线图组件 ====================
+class BarMesh:
+    """同一颜色的一批矩形合并为少量Mesh（每个Mesh受16位索引限制最多 LIMIT 个矩形）
+
+    group 为放在对应Color之后的 InstructionGroup；set 批量替换，add 追加一个矩形，pop 去掉最后一个。
+    Kivy 的 Mesh.vertices/indices 只能整体赋值，add/pop 会把当前Mesh的顶点整体重新上传，
+    代价与该Mesh中的矩形数成正比（分时图一天最多241个，可以接受；大批量请用 set）。
+    """
+    LIMIT = 16000
+    
+    def __init__(self, group):
+        self.group = group
+        self.clear()
+    
+    def clear(self):
+        self.group.clear()
+        self._mesh = None
+        self._v, self._i = [], []
+    
+    def add(self, x0, y0, x1, y1):
+        if self._mesh is None or len(self._v) >= self.LIMIT * 16:
+            self._mesh = Mesh(mode='triangles')
+            self.group.add(self._mesh)
+            self._v, self._i = [], []
+        k = len(self._v) // 4
+        self._v.extend((x0, y0, 0, 0, x1, y0, 0, 0, x1, y1, 0, 0, x0, y1, 0, 0))
+        self._i.extend((k, k+1, k+2, k+2, k+3, k))
+        self._mesh.vertices = self._v
+        self._mesh.indices = self._i
+    
+    def pop(self):
+        """去掉最后一个矩形（它总在当前Mesh里）"""
+        if self._v:
+            del self._v[-16:], self._i[-6:]
+            self._mesh.vertices = self._v
+            self._mesh.indices = self._i
+    
+    def set(self, x0, y0, x1, y1):
+        """x0/y0/x1/y1 为等长数组，一次生成顶点和索引"""
+        self.clear()
+        x0, y0, x1, y1 = (np.asarray(a, dtype=np.float64) for a in (x0, y0, x1, y1))
+        for s in range(0, len(x0), self.LIMIT):
+            a, b, c, d = x0[s:s+self.LIMIT], y0[s:s+self.LIMIT], x1[s:s+self.LIMIT], y1[s:s+self.LIMIT]
+            z = np.zeros(len(a))
+            v = np.stack([a, b, z, z, c, b, z, z, c, d, z, z, a, d, z, z], axis=1)
+            k = np.arange(len(a))[:, None] * 4 + np.array([0, 1, 2, 2, 3, 0])
+            self._v, self._i = v.ravel().tolist(), k.ravel().tolist()
+            self._mesh = Mesh(vertices=self._v, indices=self._i, mode='triangles')
+            self.group.add(self._mesh)
+
+
 class KLineChart(Widget):
-    """K线图和MACD柱状图"""
+    """K线图和MACD柱状图
+
+    影线和实体都是矩形，按涨跌分别合并进两个 BarMesh，MACD柱同理；
+    无论多少根K线，绘制指令数量固定。
+    set_candles 传入完整K线后可拖动平移、双指/滚轮缩放；视窗内K线多于 width/2
+    时按像素列合并，绘制的K线数不超过横向像素数。
+    """
     data = ListProperty([])  # [(open, high, low, close), ...]
     macd_hist = ListProperty([])
     
     def __init__(self, **kw):
         super().__init__(**kw)
-        self.bind(data=self._draw, macd_hist=self._draw, size=self._draw, pos=self._draw)
-        THEME.add_listener(self._draw)
+        with self.canvas:
+            THEME.color('card2')
+            self._bg = RoundedRectangle(radius=[dp(6)])
+            THEME.color('green')
+            self._up = BarMesh(InstructionGroup())
+            THEME.color('red')
+            self._down = BarMesh(InstructionGroup())
+        self._candles = None
+        self._hist = None
+        self._start, self._count = 0.0, 60.0   # 视窗: 起始K线序号和K线数
+        self._touches = {}
+        self._trigger = Clock.create_trigger(self._draw)
+        self.bind(data=self._trigger, macd_hist=self._trigger, pos=self._trigger, size=self._on_size)
+    
+    def _on_size(self, *a):
+        if self._candles is not None:
+            self._update_view()
+        self._trigger()
+    
+    # ---------- 视窗 ----------
+    def set_candles(self, c):
+        """c 为 candles.resample 的结果；视窗原本停在最右端时继续跟随最新K线"""
+        old = len(self._candles) if self._candles is not None else 0
+        follow = not old or self._start + self._count >= old - 0.5
+        self._candles = c
+        self._hist = macd_series(c['close'])[2] if len(c) else np.zeros(0)
+        if not old:
+            self._count = float(min(len(c), 60)) or 60.0
+        if follow:
+            self._start = len(c) - self._count
+        self._update_view()
+    
+    def _update_view(self):
+        c = self._candles
+        n = len(c)
+        self._count = min(max(self._count, min(10, n)), max(n, 1))
+        self._start = min(max(self._start, 0), max(n - self._count, 0))
+        s = int(self._start)
+        e = min(n, s + int(round(self._count)))
+        sub = c[s:e]
+        if not len(sub):
+            self.data, self.macd_hist = [], []
+            return
+        max_bars = max(int(self.width / 2), 1)
+        d = downsample(sub, max_bars, s)
+        _, ends = lod_groups(len(sub), max_bars, s)
+        self.data = np.column_stack([d['open'], d['high'], d['low'], d['close']]).tolist()
+        self.macd_hist = self._hist[s:e][ends - 1].tolist()
+    
+    def on_touch_down(self, touch):
+        if self._candles is None or not self.collide_point(*touch.pos):
+            return super().on_touch_down(touch)
+        if touch.is_mouse_scrolling:
+            self._zoom(1.2 if touch.button == 'scrolldown' else 1 / 1.2, touch.x)
+            return True
+        touch.grab(self)
+        self._touches[touch.uid] = touch.pos
+        return True
+    
+    def on_touch_move(self, touch):
+        if touch.grab_current is not self:
+            return super().on_touch_move(touch)
+        old = dict(self._touches)
+        self._touches[touch.uid] = touch.pos
+        if len(old) == 1:
+            self._start -= (touch.x - old[touch.uid][0]) * self._count / max(self.width, 1)
+            self._update_view()
+        elif len(old) == 2:
+            (a0, b0), (a1, b1) = old.values(), self._touches.values()
+            d0 = abs(a0[0] - b0[0]) or 1
+            d1 = abs(a1[0] - b1[0]) or 1
+            self._zoom(d0 / d1, (a1[0] + b1[0]) / 2)
+        return True
+    
+    def on_touch_up(self, touch):
+        if touch.grab_current is not self:
+            return super().on_touch_up(touch)
+        touch.ungrab(self)
+        self._touches.pop(touch.uid, None)
+        return True
+    
+    def _zoom(self, f, x):
+        """以横坐标x处的K线为中心缩放视窗，f>1显示更多K线"""
+        a = min(max((x - self.x) / max(self.width, 1), 0), 1)
+        count = self._count * f
+        self._start += a * (self._count - count)
+        self._count = count
+        self._update_view()
     
     def _draw(self, *a):
-        self.canvas.clear()
-        with self.canvas:
-            Color(*get_color_from_hex(THEME.get('card2')))
-            RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(6)])
-        
+        self._bg.pos, self._bg.size = self.pos, self.size
         if not self.data or len(self.data) < 2:
+            self._up.clear()
+            self._down.clear()
             return
         
         # K线区域（上70%）
@@ -387,118 +507,217 @@ class KLineChart(Widget):
         m_height = self.height * 0.30
         m_y = self.y + dp(5)
         
-        n = len(self.data)
+        d = np.asarray(self.data, dtype=np.float64)
+        n = len(d)
+        o, h, l, c = d.T
         bar_width = (self.width - dp(10)) / n * 0.8
         gap = (self.width - dp(10)) / n * 0.2
+        x = self.x + dp(5) + np.arange(n) * (bar_width + gap)
         
         # 计算K线范围
-        all_prices = [p for d in self.data for p in d]
-        pmin, pmax = min(all_prices), max(all_prices)
+        pmin, pmax = d.min(), d.max()
         if pmax == pmin: pmax = pmin + 0.01
-        
-        with self.canvas:
-            # 绘制K线
-            for i, (o, h, l, c) in enumerate(self.data):
-                x = self.x + dp(5) + i * (bar_width + gap)
-                
-                # 颜色
-                if c >= o:
-                    Color(*get_color_from_hex(THEME.get('green')))
-                else:
-                    Color(*get_color_from_hex(THEME.get('red')))
-                
-                # 影线
-                hy = k_y + (h - pmin) / (pmax - pmin) * k_height
-                ly = k_y + (l - pmin) / (pmax - pmin) * k_height
-                cx = x + bar_width / 2
-                Line(points=[cx, ly, cx, hy], width=1)
-                
-                # 实体
-                oy = k_y + (o - pmin) / (pmax - pmin) * k_height
-                cy = k_y + (c - pmin) / (pmax - pmin) * k_height
-                body_h = max(abs(cy - oy), dp(1))
-                Rectangle(pos=(x, min(oy, cy)), size=(bar_width, body_h))
-            
-            # 绘制MACD柱状图
-            if self.macd_hist:
-                hmax = max(abs(h) for h in self.macd_hist) or 1
-                mid_y = m_y + m_height / 2
-                
-                for i, h in enumerate(self.macd_hist[-n:]):
-                    x = self.x + dp(5) + i * (bar_width + gap)
-                    if h >= 0:
-                        Color(*get_color_from_hex(THEME.get('green')))
-                    else:
-                        Color(*get_color_from_hex(THEME.get('red')))
-                    
-                    bar_h = abs(h) / hmax * (m_height / 2 - dp(2))
-                    by = mid_y if h >= 0 else mid_y - bar_h
-                    Rectangle(pos=(x, by), size=(bar_width, bar_h))
+        to_y = lambda v: k_y + (v - pmin) / (pmax - pmin) * k_height
+        
+        # 影线(1像素宽)和实体
+        cx = x + bar_width / 2
+        oy, cy = to_y(o), to_y(c)
+        bot = np.minimum(oy, cy)
+        top = np.maximum(bot + dp(1), np.maximum(oy, cy))
+        x0 = np.concatenate([cx - 0.5, x])
+        x1 = np.concatenate([cx + 0.5, x + bar_width])
+        y0 = np.concatenate([to_y(l), bot])
+        y1 = np.concatenate([to_y(h), top])
+        up = np.tile(c >= o, 2)
+        
+        # MACD柱状图
+        if self.macd_hist:
+            hist = np.asarray(self.macd_hist[-n:], dtype=np.float64)
+            hmax = np.abs(hist).max() or 1
+            mid_y = m_y + m_height / 2
+            bar_h = np.abs(hist) / hmax * (m_height / 2 - dp(2))
+            hx = x[:len(hist)]
+            x0 = np.concatenate([x0, hx])
+            x1 = np.concatenate([x1, hx + bar_width])
+            y0 = np.concatenate([y0, np.where(hist >= 0, mid_y, mid_y - bar_h)])
+            y1 = np.concatenate([y1, np.where(hist >= 0, mid_y + bar_h, mid_y)])
+            up = np.concatenate([up, hist >= 0])
+        
+        self._up.set(x0[up], y0[up], x1[up], y1[up])
+        self._down.set(x0[~up], y0[~up], x1[~up], y1[~up])
 
 # ==================== 分时图组件 ====================
 class ChartWidget(Widget):
+    """分时图（保留模式）
+
+    画布指令只创建一次：新增分钟只计算新增的点和量柱，最后一分钟被上游改写时只替换最后一个点和量柱；
+    但 Kivy 的 Line.points 只能整体赋值，每次变化仍会把整条线（一天最多241个点）重新上传，
+    量柱同理见 BarMesh。价格/成交量使用数据坐标(序号, 值)，缩放由 Translate/Scale 完成，
+    尺寸变化时原地修改已有指令，颜色由 THEME.color 跟随主题。
+    """
     prices = ListProperty([])
     volumes = ListProperty([])
+    overlays = ListProperty([])  # [(主题颜色key, 与prices等长的序列), ...]，NaN处不画
     
     def __init__(self, **kw):
         super().__init__(**kw)
-        self.bind(prices=self._draw, volumes=self._draw, size=self._draw, pos=self._draw)
-        THEME.add_listener(self._draw)
-    
-    def _draw(self, *a):
-        self.canvas.clear()
         with self.canvas:
-            Color(*get_color_from_hex(THEME.get('card2')))
-            RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(6)])
-        
-        if len(self.prices) < 2:
-            return
-        
-        # 价格区域（上70%）
+            THEME.color('card2')
+            self._bg = RoundedRectangle(radius=[dp(6)])
+            Color(1, 1, 1, 0.05)
+            self._grid = [Line() for _ in range(3)]
+            THEME.color('yellow', 0.5)
+            self._avg = Line(dash_offset=5)
+            # 价格区: (序号, 价格) -> 像素
+            PushMatrix()
+            self._p_move = Translate()
+            self._p_scale = Scale()
+            self._p_base = Translate()
+            THEME.color('blue')
+            self._line = Line()
+            self._ov_group = InstructionGroup()
+            PopMatrix()
+            # 成交量区: (序号, 成交量) -> 像素，涨跌两组各共用一个Color
+            PushMatrix()
+            self._v_move = Translate()
+            self._v_scale = Scale()
+            THEME.color('green', 0.6)
+            self._up_bars = BarMesh(InstructionGroup())
+            THEME.color('red', 0.6)
+            self._down_bars = BarMesh(InstructionGroup())
+            PopMatrix()
+        self._reset()
+        self._trigger = Clock.create_trigger(self._sync)
+        self.bind(prices=self._trigger, volumes=self._trigger, overlays=self._trigger,
+                  size=self._layout, pos=self._layout)
+    
+    def _reset(self):
+        self._pts = []      # 价格线点 [i0, p0, i1, p1, ...]
+        self._nv = 0        # 已画量柱数
+        self._sum = 0.0
+        self._mn, self._mx = float('inf'), float('-inf')
+        self._vmax = 0
+        self._last_bars = None  # 最后一根量柱所在的 BarMesh
+        self._vlast = 0         # 最后一根量柱的成交量
+        self._line.points = []
+        self._up_bars.clear()
+        self._down_bars.clear()
+        self._ov_group.clear()
+        self._ov = []       # [[key, Line, 点列表, 已处理个数], ...]
+    
+    def _sync(self, *a):
+        """把 prices/volumes/overlays 中新增的部分追加到已有指令；
+        只有最后一分钟变了就原地替换它，数据被替换（换股/换日）时重建"""
+        p, pts = self.prices, self._pts
+        n = len(pts) // 2
+        tail = False
+        if n and (len(p) < n or p[0] != pts[1] or (n > 1 and p[n-2] != pts[-3])):
+            self._reset()
+            pts, n = self._pts, 0
+        elif n and p[n-1] != pts[-1]:
+            tail = True
+            old, pts[-1] = pts[-1], p[n-1]
+            self._sum += p[n-1] - old
+            # 旧的最后一个值可能是极值，重新统计（叠加线的在 _sync_overlays 里补上）
+            self._mn, self._mx = min(pts[1::2]), max(pts[1::2])
+            self._line.points = pts
+        if len(p) > n:
+            for i in range(n, len(p)):
+                x = p[i]
+                pts.extend((i, x))
+                self._sum += x
+                if x < self._mn: self._mn = x
+                if x > self._mx: self._mx = x
+            self._line.points = pts
+        
+        v = self.volumes
+        if len(v) < self._nv:
+            self._up_bars.clear()
+            self._down_bars.clear()
+            self._nv, self._vmax = 0, 0
+        elif self._nv and (v[self._nv-1] != self._vlast or (tail and self._nv == n)):
+            # 最后一分钟被改写：量柱高度或涨跌颜色可能变了，去掉重画
+            self._last_bars.pop()
+            self._nv -= 1
+            tail = True
+        for i in range(self._nv, min(len(v), len(p))):
+            up = i > 0 and p[i] >= p[i-1]
+            self._last_bars = self._up_bars if up else self._down_bars
+            self._last_bars.add(i, 0, i + 0.8, v[i])
+            if v[i] > self._vmax: self._vmax = v[i]
+        self._nv = max(self._nv, min(len(v), len(p)))
+        if self._nv:
+            self._vlast = v[self._nv-1]
+        if tail:
+            self._vmax = max(v[:self._nv])
+        
+        self._sync_overlays(n if tail else 0)  # n 为本次追加前的分钟数
+        self._layout()
+    
+    def _sync_overlays(self, tail=0):
+        """tail>0: 追加前的最后一分钟（序号tail-1）被改写，各叠加线从该点起重算"""
+        ov = self.overlays
+        if [k for k, _ in ov] != [e[0] for e in self._ov]:
+            self._ov_group.clear()
+            self._ov = []
+            for key, _ in ov:
+                l = Line()
+                self._ov_group.add(THEME.color(key, 0.8))
+                self._ov_group.add(l)
+                self._ov.append([key, l, [], 0])
+        n = len(self._pts) // 2
+        for e, (_, ys) in zip(self._ov, ov):
+            if len(ys) < e[3]:
+                e[2], e[3] = [], 0
+                e[1].points = []
+            elif tail and e[3] >= tail:
+                while e[2] and e[2][-2] >= tail - 1:
+                    del e[2][-2:]
+                e[3] = tail - 1
+            if tail:
+                for y in e[2][1::2]:
+                    if y < self._mn: self._mn = y
+                    if y > self._mx: self._mx = y
+            start, end = e[3], min(len(ys), n)
+            for i in range(start, end):
+                y = ys[i]
+                if y == y:  # 跳过NaN
+                    e[2].extend((i, y))
+                    if y < self._mn: self._mn = y
+                    if y > self._mx: self._mx = y
+            if end > start or tail:
+                e[1].points = e[2]
+            e[3] = max(e[3], end)
+    
+    def _layout(self, *a):
+        """只更新背景、网格和坐标变换，O(1)"""
+        self._bg.pos, self._bg.size = self.pos, self.size
+        n = len(self._pts) // 2
         p_height = self.height * 0.7
         p_y = self.y + self.height * 0.3
+        if n < 2:
+            for g in self._grid: g.points = []
+            self._avg.points = []
+            self._p_scale.xyz = self._v_scale.xyz = (0, 0, 1)
+            return
+        for i, g in enumerate(self._grid, 1):
+            y = p_y + p_height * i / 4
+            g.points = [self.x+5, y, self.x+self.width-5, y]
         
-        mn, mx = min(self.prices), max(self.prices)
+        mn, mx = self._mn, self._mx
         if mx == mn: mx += 0.01
+        self._p_move.xy = (self.x + 5, p_y)
+        self._p_scale.xyz = ((self.width-10) / (n-1), p_height / (mx-mn), 1)
+        self._p_base.xy = (0, -mn)
         
-        with self.canvas:
-            # 网格
-            Color(1,1,1,0.05)
-            for i in range(1, 4):
-                y = p_y + p_height * i / 4
-                Line(points=[self.x+5, y, self.x+self.width-5, y])
-            
-            # 均价线
-            avg = np.mean(self.prices)
-            avg_y = p_y + (avg - mn) / (mx - mn) * p_height
-            Color(*get_color_from_hex(THEME.get('yellow')), 0.5)
-            Line(points=[self.x+5, avg_y, self.x+self.width-5, avg_y], dash_offset=5)
-            
-            # 价格线
-            Color(*get_color_from_hex(THEME.get('blue')))
-            pts = []
-            for i, p in enumerate(self.prices):
-                x = self.x + 5 + (self.width-10)*i/(len(self.prices)-1)
-                y = p_y + (p-mn)/(mx-mn)*p_height
-                pts.extend([x, y])
-            if pts: Line(points=pts, width=1.5)
-            
-            # 成交量柱状图
-            if self.volumes:
-                v_height = self.height * 0.25
-                v_y = self.y + dp(3)
-                vmax = max(self.volumes) or 1
-                bar_w = (self.width - 10) / len(self.volumes)
-                
-                for i, v in enumerate(self.volumes):
-                    x = self.x + 5 + i * bar_w
-                    h = v / vmax * v_height
-                    # 量能颜色
-                    if i > 0 and self.prices[i] >= self.prices[i-1]:
-                        Color(*get_color_from_hex(THEME.get('green')), 0.6)
-                    else:
-                        Color(*get_color_from_hex(THEME.get('red')), 0.6)
-                    Rectangle(pos=(x, v_y), size=(bar_w*0.8, h))
+        avg_y = p_y + (self._sum / n - mn) / (mx - mn) * p_height
+        self._avg.points = [self.x+5, avg_y, self.x+self.width-5, avg_y]
+        
+        if self._nv:
+            self._v_move.xy = (self.x + 5, self.y + dp(3))
+            self._v_scale.xyz = ((self.width-10) / self._nv, self.height * 0.25 / (self._vmax or 1), 1)
+        else:
+            self._v_scale.xyz = (0, 0, 1)
 
 # ==================== 主页 ====================
 class HomePage(BoxLayout):
@@ -510,28 +729,24 @@ class HomePage(BoxLayout):
         
         # 添加背景
         with self.canvas.before:
-            Color(*get_color_from_hex(THEME.get('bg')))
+            THEME.color('bg')
             self.bg_rect = Rectangle(pos=self.pos, size=self.size)
         self.bind(pos=self._upd_bg, size=self._upd_bg)
         
         self._build()
         Clock.schedule_once(lambda dt: self.refresh(), 1)
-        THEME.add_listener(self._update_theme)
     
     def _upd_bg(self, *a):
         self.bg_rect.pos = self.pos
         self.bg_rect.size = self.size
     
-    def _update_theme(self):
-        pass
-    
     def _build(self):
         # 股票信息
         info = Card(size_hint_y=0.12, orientation='horizontal')
         left = BoxLayout(orientation='vertical', size_hint_x=0.55)
         self.name_lbl = CLabel(text='加载中...', font_size=sp(15), bold=True, halign='left')
         self.name_lbl.bind(size=lambda *a: setattr(self.name_lbl, 'text_size', self.name_lbl.size))
-        self.code_lbl = CLabel(text=DATA.current, font_size=sp(10), color=get_color_from_hex(THEME.get('gray')), halign='left')
+        self.code_lbl = CLabel(text=DATA.current, font_size=sp(10), color_key='gray', halign='left')
         self.code_lbl.bind(size=lambda *a: setattr(self.code_lbl, 'text_size', self.code_lbl.size))
         left.add_widget(self.name_lbl)
         left.add_widget(self.code_lbl)
@@ -547,9 +762,23 @@ class HomePage(BoxLayout):
         info.add_widget(right)
         self.add_widget(info)
         
-        # 分时图 + 成交量
-        self.chart = ChartWidget(size_hint_y=0.25)
-        self.add_widget(self.chart)
+        # 分时图 + 成交量 / K线，上方切换周期
+        box = BoxLayout(orientation='vertical', size_hint_y=0.25, spacing=dp(2))
+        bar = BoxLayout(size_hint_y=None, height=dp(22), spacing=dp(3))
+        for text, period in (('分时', None), ('5分', 5), ('15分', 15), ('60分', 60), ('日K', 'day')):
+            b = CButton(text=text, font_size=sp(10))
+            b.bind(on_press=lambda x, p=period: self._set_period(p))
+            bar.add_widget(b)
+        box.add_widget(bar)
+        self.chart_area = BoxLayout()
+        self.chart = ChartWidget()
+        self.kline = KLineChart()
+        self.chart_area.add_widget(self.chart)
+        box.add_widget(self.chart_area)
+        self.add_widget(box)
+        self.period = None
+        self.kline_code = None
+        self._past_kline = {}  # (code, 周期) -> (今天之前的交易日, 这些日子合成的K线)
         
         # 指标行1
         g1 = GridLayout(cols=4, spacing=dp(3), size_hint_y=0.10)
@@ -589,7 +818,7 @@ class HomePage(BoxLayout):
         pb = BoxLayout(size_hint_y=0.30, padding=[0, dp(2)])
         self.progress = ProgressBar(max=100)
         pb.add_widget(self.progress)
-        self.score_lbl = CLabel(text='评分: 0/100', font_size=sp(10), color=get_color_from_hex(THEME.get('gray')), size_hint_y=0.25)
+        self.score_lbl = CLabel(text='评分: 0/100', font_size=sp(10), color_key='gray', size_hint_y=0.25)
         sig.add_widget(self.sig_lbl)
         sig.add_widget(pb)
         sig.add_widget(self.score_lbl)
@@ -607,7 +836,7 @@ class HomePage(BoxLayout):
         btns = BoxLayout(size_hint_y=0.10, spacing=dp(6))
         rb = CButton(text='刷新', font_size=sp(12))
         rb.bind(on_release=lambda x: self.refresh())
-        self.mon_btn = CButton(text='监控', font_size=sp(12), background_color=get_color_from_hex(THEME.get('green')))
+        self.mon_btn = CButton(text='监控', font_size=sp(12), bg_key='green')
         self.mon_btn.bind(on_release=lambda x: self.toggle_mon())
         btns.add_widget(rb)
         btns.add_widget(self.mon_btn)
@@ -616,25 +845,79 @@ class HomePage(BoxLayout):
         self.monitoring = False
     
     def refresh(self):
-        def f():
-            q = fetch_quote(DATA.current)
-            p, v = fetch_prices(DATA.current)
-            if q: DATA.stock_cache[DATA.current] = q
-            if p: DATA.prices_cache[DATA.current] = (p, v)
-            Clock.schedule_once(lambda dt: self.update(q, p, v), 0)
-        threading.Thread(target=f, daemon=True).start()
-    
-    def update(self, q, p, v):
+        ENGINE.submit('home', self._fetch, self._on_data, follow=True)
+    
+    def _fetch(self, code):
+        """引擎线程中执行"""
+        q, qa = get_quote(code)
+        s, sa = get_prices(code, DATA.prices_cache, STORE)
+        age = data_age(qa, sa)
+        if not s or not s.n:
+            return q, [], [], None, [], age
+        sig = PIPELINE.evaluate(code, s, q['price'] if q else s.prices[-1], datetime.now())
+        p = s.prices.copy()
+        up, _, low = boll_series(p)
+        overlays = [('yellow', ma_series(p, 5).tolist()), ('purple', ma_series(p, 20).tolist()),
+                    ('gray', up.tolist()), ('gray', low.tolist())]
+        return q, p.tolist(), s.volumes.tolist(), sig, overlays, age
+    
+    def _on_data(self, res):
+        q, p, v, sig, overlays, age = res
+        if q: DATA.stock_cache[q['code']] = q
+        self.update(q, p, v, sig, overlays, age)
+        if self.period:
+            self._load_kline()
+    
+    def _set_period(self, period):
+        """None为分时图，否则为K线周期（分钟数或'day'）"""
+        self.period = period
+        self.chart_area.clear_widgets()
+        self.chart_area.add_widget(self.kline if period else self.chart)
+        if period:
+            self.kline._candles = None  # 换周期后视窗重新定位到最新
+            self._load_kline()
+    
+    def _load_kline(self):
+        ENGINE.submit('kline', self._fetch_kline, self._on_kline, follow=True)
+    
+    def _fetch_kline(self, code):
+        """从TickStore读取多日分时合成K线（引擎线程中执行）
+
+        K线不跨交易日：之前各日的K线按(代码, 周期)缓存，每次刷新只重新合成最新一天的分时。
+        """
+        period = self.period
+        if not period:
+            return None
+        ds = STORE.dates(code)[-(120 if period == 'day' else 10):]
+        if not ds:
+            return code, period, resample([], [], [], [], period)
+        last, past = ds[-1], tuple(ds[:-1])
+        e = self._past_kline.get((code, period))
+        if e is None or e[0] != past:
+            dates, times, prices, volumes = STORE.history(code, len(past), before=last) if past else ([],) * 4
+            e = self._past_kline[(code, period)] = (past, resample(dates, times, prices, volumes, period))
+        times, prices, volumes = STORE.day(code, last)
+        today = resample(np.full(len(times), last, dtype='U6'), times, prices, volumes, period)
+        return code, period, np.concatenate([e[1], today])
+    
+    def _on_kline(self, res):
+        if res and res[1] == self.period:
+            if res[0] != self.kline_code:
+                self.kline_code = res[0]
+                self.kline._candles = None  # 换股后视窗重新定位到最新
+            self.kline.set_candles(res[2])
+    
+    def update(self, q, p, v, sig=None, overlays=(), age=None):
         if q:
             self.name_lbl.text = q['name']
-            self.code_lbl.text = q['code']
+            self.code_lbl.text = q['code'] + stale_text(age)
             # 动画更新价格
             self.price_lbl.animate_to(q['price'])
             
             c = q['change']
             self.change_lbl.text = f"{'+' if c>=0 else ''}{c:.2f}%"
-            col = THEME.get('green') if c>=0 else THEME.get('red')
-            self.price_lbl.color = self.change_lbl.color = get_color_from_hex(col)
+            col = 'green' if c>=0 else 'red'
+            self.price_lbl.color_key = self.change_lbl.color_key = col
             
             # 检查预警
             alert_msg = check_alerts(q['code'], q['price'])
@@ -642,83 +925,76 @@ class HomePage(BoxLayout):
                 play_sound()
                 vibrate()
         
-        if p:
+        if p and sig:
+            a = sig.analysis
             self.chart.prices = p
             self.chart.volumes = v if v else []
+            self.chart.overlays = list(overlays)
             
-            rsi = calc_rsi(p)
-            macd, sig, hist = calc_macd(p)
-            k, d, j = calc_kdj(p)
-            ma5 = calc_ma(p, 5)
-            sup, res = calc_sr(p)
-            vol_r = calc_volume_ratio(v) if v else 1.0
-            pat = detect_pattern(p)
-            trend, _ = predict_trend(p, ma5, calc_ma(p, 10))
+            rsi = a.rsi
+            _, _, hist = a.macd
+            k, d, j = a.kdj
+            ma5 = a.ma5
+            sup, res = a.sr
+            vol_r = a.volume_ratio
+            pat = a.pattern
+            trend = a.trend
             
-            self.rsi_box.set(rsi, THEME.get('green') if rsi<40 else (THEME.get('red') if rsi>60 else THEME.get('text')))
-            self.macd_box.set(f"{hist:+.3f}", THEME.get('green') if hist>0 else THEME.get('red'))
-            self.k_box.set(k, THEME.get('green') if k<30 else (THEME.get('red') if k>70 else THEME.get('text')))
+            self.rsi_box.set(rsi, 'green' if rsi<40 else ('red' if rsi>60 else 'text'))
+            self.macd_box.set(f"{hist:+.3f}", 'green' if hist>0 else 'red')
+            self.k_box.set(k, 'green' if k<30 else ('red' if k>70 else 'text'))
             self.d_box.set(d)
-            self.sup_box.set(sup, THEME.get('green'))
-            self.res_box.set(res, THEME.get('red'))
-            self.vol_box.set(vol_r, THEME.get('green') if vol_r<0.8 else THEME.get('text'))
-            self.ma5_box.set(ma5, THEME.get('yellow'))
+            self.sup_box.set(sup, 'green')
+            self.res_box.set(res, 'red')
+            self.vol_box.set(vol_r, 'green' if vol_r<0.8 else 'text')
+            self.ma5_box.set(ma5, 'yellow')
             
             self.trend_lbl.text = f"趋势: {trend}"
             self.pattern_lbl.text = f"形态: {pat}"
             
             if q:
-                sc = calc_score(q['price'], sup, res, rsi, pat, k, vol_r)
+                sc, text, col = signal_display(sig)
                 # 动画更新进度条
                 anim = Animation(value=sc, duration=0.3)
                 anim.start(self.progress)
                 self.score_lbl.text = f"评分: {sc}/100"
-                
-                if sc >= 70:
-                    self.sig_lbl.text = "买入信号!"
-                    self.sig_lbl.color = get_color_from_hex(THEME.get('green'))
+                self.sig_lbl.text = text
+                self.sig_lbl.color_key = col
+                if sig.level == 'buy':
                     self._record_signal('买入', q['price'], sc)
                     play_sound()
                     vibrate()
-                elif sc >= 55:
-                    self.sig_lbl.text = "弱买入"
-                    self.sig_lbl.color = get_color_from_hex(THEME.get('yellow'))
-                elif sc <= 30:
-                    self.sig_lbl.text = "观望/卖出"
-                    self.sig_lbl.color = get_color_from_hex(THEME.get('red'))
-                else:
-                    self.sig_lbl.text = "暂无信号"
-                    self.sig_lbl.color = get_color_from_hex(THEME.get('gray'))
         
         self.hold_lbl.text = f"持仓: {DATA.position['hold']*100:.0f}%"
-        pcolor = THEME.get('green') if DATA.position['profit'] >= 0 else THEME.get('red')
+        pcolor = 'green' if DATA.position['profit'] >= 0 else 'red'
         self.profit_lbl.text = f"盈亏: {DATA.position['profit']:+.2f}%"
-        self.profit_lbl.color = get_color_from_hex(pcolor)
+        self.profit_lbl.color_key = pcolor
     
     def _record_signal(self, typ, price, score):
         now = datetime.now().strftime('%H:%M')
         if DATA.signals and DATA.signals[-1].get('time') == now and DATA.signals[-1].get('code') == DATA.current:
             return
-        DATA.signals.append({
+        rec = {
             'time': now, 'date': datetime.now().strftime('%m-%d'),
             'code': DATA.current, 'type': typ, 'price': price, 'score': score
-        })
-        if len(DATA.signals) > 100:
-            DATA.signals = DATA.signals[-100:]
+        }
+        DATA.signals.append(rec)
+        DATA.signals_version += 1
+        STATE.append('signals', rec)
+        if len(DATA.signals) > MAX_SIGNALS + 1000:  # 超出一批再裁剪，不必每条都写trim
+            DATA.signals = DATA.signals[-MAX_SIGNALS:]
+            STATE.trim('signals', MAX_SIGNALS)
     
     def toggle_mon(self):
         self.monitoring = not self.monitoring
         if self.monitoring:
             self.mon_btn.text = '停止'
-            self.mon_btn.background_color = get_color_from_hex(THEME.get('red'))
-            Clock.schedule_interval(self._mon, 30)
+            self.mon_btn.bg_key = 'red'
+            ENGINE.schedule('home_mon', 30, self._fetch, self._on_data, follow=True, delay=30)
         else:
             self.mon_btn.text = '监控'
-            self.mon_btn.background_color = get_color_from_hex(THEME.get('green'))
-            Clock.unschedule(self._mon)
-    
-    def _mon(self, dt):
-        self.refresh()
+            self.mon_btn.bg_key = 'green'
+            ENGINE.cancel('home_mon')
 
 
 # ==================== 自选股页 ====================
@@ -744,10 +1020,11 @@ class WatchlistPage(BoxLayout):
         self.add_widget(sv)
         
         self.cards = {}
+        self.signals = {}  # {code: Signal}
+        self.ages = {}     # {code: 数据年龄}
         self._build_list()
         # 延迟启动更新，避免初始化时阻塞
-        Clock.schedule_once(lambda dt: self.update_list(), 2)
-        Clock.schedule_interval(self.update_list, 30)
+        ENGINE.schedule('watchlist', 30, self._fetch_list, self._on_list, delay=2)
     
     def _build_list(self):
         self.list_box.clear_widgets()
@@ -759,23 +1036,28 @@ class WatchlistPage(BoxLayout):
     
     def _make_card(self, code):
         # 使用Button作为整个卡片，确保点击可靠
-        btn = Button(size_hint_y=None, height=dp(55),
-                    background_normal='', background_color=get_color_from_hex(THEME.get('card')))
+        btn = CButton(size_hint_y=None, height=dp(55), bg_key='card')
         btn.code = code
         btn.bind(on_release=lambda x: self._select_stock(x.code))
         
         # 卡片内容（叠加在按钮上）
         content = BoxLayout(orientation='horizontal', padding=dp(8))
         
-        left = BoxLayout(orientation='vertical', size_hint_x=0.5)
+        left = BoxLayout(orientation='vertical', size_hint_x=0.4)
         name = CLabel(text=code, font_size=sp(13), bold=True, halign='left')
         name.bind(size=lambda *a, n=name: setattr(n, 'text_size', n.size))
-        code_lbl = CLabel(text=code, font_size=sp(9), color=get_color_from_hex(THEME.get('gray')), halign='left')
+        code_lbl = CLabel(text=code, font_size=sp(9), color_key='gray', halign='left')
         code_lbl.bind(size=lambda *a, c=code_lbl: setattr(c, 'text_size', c.size))
         left.add_widget(name)
         left.add_widget(code_lbl)
         
-        right = BoxLayout(orientation='vertical', size_hint_x=0.5)
+        mid = BoxLayout(orientation='vertical', size_hint_x=0.25)
+        score = CLabel(text='--', font_size=sp(12), bold=True)
+        sig = CLabel(text='', font_size=sp(9), color_key='gray')
+        mid.add_widget(score)
+        mid.add_widget(sig)
+        
+        right = BoxLayout(orientation='vertical', size_hint_x=0.35)
         price = CLabel(text='--', font_size=sp(14), bold=True, halign='right')
         price.bind(size=lambda *a, p=price: setattr(p, 'text_size', p.size))
         change = CLabel(text='--', font_size=sp(10), halign='right')
@@ -784,10 +1066,14 @@ class WatchlistPage(BoxLayout):
         right.add_widget(change)
         
         content.add_widget(left)
+        content.add_widget(mid)
         content.add_widget(right)
         btn.add_widget(content)
         
         btn.name_lbl = name
+        btn.code_lbl = code_lbl
+        btn.score_lbl = score
+        btn.sig_lbl = sig
         btn.price_lbl = price
         btn.change_lbl = change
         return btn
@@ -799,23 +1085,45 @@ class WatchlistPage(BoxLayout):
             self.on_select(code)
     
     def update_list(self, dt=None):
-        def f():
-            for code in DATA.watchlist:
-                q = fetch_quote(code)
-                if q: DATA.stock_cache[code] = q
-            Clock.schedule_once(lambda dt: self._upd_cards(), 0)
-        threading.Thread(target=f, daemon=True).start()
+        ENGINE.submit('watchlist_once', self._fetch_list, self._on_list)
+    
+    def _fetch_list(self):
+        """行情+分时，整个自选列表一次向量化评分（引擎线程中执行）
+
+        行情一次批量请求；分时走缓存，过期的并发拉取，不会逐只串行等待
+        """
+        got = get_quotes(list(DATA.watchlist))
+        quotes = {code: q for code, (q, _) in got.items()}
+        series = get_prices_many(list(quotes), DATA.prices_cache, STORE)
+        items = [(code, series.get(code, (None, None))[0], q['price']) for code, q in quotes.items()]
+        ages = {code: data_age(got[code][1], series.get(code, (None, None))[1]) for code in quotes}
+        return quotes, PIPELINE.evaluate_many(items, datetime.now()), ages
+    
+    def _on_list(self, res):
+        quotes, signals, ages = res
+        DATA.stock_cache.update(quotes)
+        self.signals = signals
+        self.ages = ages
+        self._upd_cards()
     
     def _upd_cards(self):
         for code, card in self.cards.items():
             q = DATA.stock_cache.get(code)
             if q:
                 card.name_lbl.text = q['name']
+                card.code_lbl.text = code + stale_text(self.ages.get(code))
                 card.price_lbl.text = f"{q['price']:.2f}"
                 c = q['change']
                 card.change_lbl.text = f"{'+' if c>=0 else ''}{c:.2f}%"
-                col = THEME.get('green') if c>=0 else THEME.get('red')
-                card.price_lbl.color = card.change_lbl.color = get_color_from_hex(col)
+                col = 'green' if c>=0 else 'red'
+                card.price_lbl.color_key = card.change_lbl.color_key = col
+            s = self.signals.get(code)
+            if s:
+                sig, col = {'buy': ('买入', 'green'), 'weak_buy': ('弱买入', 'yellow'),
+                            'sell': ('观望', 'red'), 'none': ('无信号', 'gray')}[s.level]
+                card.score_lbl.text = str(s.score)
+                card.sig_lbl.text = sig
+                card.score_lbl.color_key = card.sig_lbl.color_key = col
     
     def add_stock(self):
         content = BoxLayout(orientation='vertical', padding=dp(12), spacing=dp(8))
@@ -827,7 +1135,9 @@ class WatchlistPage(BoxLayout):
             code = inp.text.strip()
             if code and code not in DATA.watchlist:
                 DATA.watchlist.append(code)
+                STATE.set('watchlist', DATA.watchlist)
                 self._build_list()
+                self.update_list()
             popup.dismiss()
         
         sb = CButton(text='添加', size_hint_y=None, height=dp(32))
@@ -838,48 +1148,119 @@ class WatchlistPage(BoxLayout):
 
 
 # ==================== 历史信号页 ====================
+class SignalRow(BoxLayout):
+    """历史信号的一行；由 RecycleView 复用，滚动时只改文字"""
+    sig_time = StringProperty('')
+    sig_code = StringProperty('')
+    sig_type = StringProperty('')
+    sig_price = StringProperty('')
+    sig_score = StringProperty('')
+    
+    def __init__(self, **kw):
+        super().__init__(**kw)
+        self.padding = dp(4)
+        with self.canvas.before:
+            THEME.color('card')
+            self._bg = RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(4)])
+        self.bind(pos=self._draw_bg, size=self._draw_bg)
+        props = ('sig_time', 'sig_code', 'sig_type', 'sig_price', 'sig_score')
+        for prop, w in zip(props, (0.28, 0.18, 0.14, 0.2, 0.1)):
+            lbl = CLabel(font_size=sp(10), size_hint_x=w)
+            self.bind(**{prop: lbl.setter('text')})
+            self.add_widget(lbl)
+            if prop == 'sig_type':
+                self.type_lbl = lbl
+        self.bind(sig_type=self._type_color)
+    
+    def _draw_bg(self, *a):
+        self._bg.pos, self._bg.size = self.pos, self.size
+    
+    def _type_color(self, w, v):
+        self.type_lbl.color_key = 'green' if v == '买入' else 'red'
+
+
 class HistoryPage(BoxLayout):
+    """历史信号列表
+    
+    RecycleView 只为可见的行创建视图并循环复用，几万条信号也能流畅滚动；
+    DATA.signals_version 和筛选条件都没变时 update 直接返回；新增信号只转换新增的部分，
+    用切片赋值插到 rv.data 前面，不重新拷贝整个列表。
+    """
+    TYPES = ('全部', '买入')  # 目前只记录买入信号
+    
     def __init__(self, **kw):
         super().__init__(**kw)
         self.orientation = 'vertical'
         self.padding = dp(6)
         self.spacing = dp(5)
-        
+    
         hdr = BoxLayout(size_hint_y=None, height=dp(35))
         hdr.add_widget(CLabel(text='历史信号', font_size=sp(15), bold=True))
         eb = CButton(text='导出', size_hint_x=None, width=dp(55), font_size=sp(11))
         eb.bind(on_press=lambda x: self.export())
         hdr.add_widget(eb)
         self.add_widget(hdr)
-        
-        sv = ScrollView()
-        self.list_box = BoxLayout(orientation='vertical', spacing=dp(3), size_hint_y=None)
-        self.list_box.bind(minimum_height=self.list_box.setter('height'))
-        sv.add_widget(self.list_box)
-        self.add_widget(sv)
-        
+    
+        # 筛选: 股票代码（前缀匹配）+ 类型
+        flt = BoxLayout(size_hint_y=None, height=dp(35), spacing=dp(4))
+        self.code_inp = TextInput(hint_text='股票代码', multiline=False, font_size=sp(12))
+        self.type_btn = CButton(text=self.TYPES[0], size_hint_x=None, width=dp(55), font_size=sp(11),
+                                bg_key='purple')
+        self.type_btn.bind(on_press=lambda x: self._next_type())
+        self.count_lbl = CLabel(text='', font_size=sp(10), color_key='gray',
+                                size_hint_x=None, width=dp(60))
+        flt.add_widget(self.code_inp)
+        flt.add_widget(self.type_btn)
+        flt.add_widget(self.count_lbl)
+        self.add_widget(flt)
+    
+        self.empty_lbl = CLabel(text='暂无历史信号', font_size=sp(12), color_key='gray',
+                                size_hint_y=None, height=dp(35))
+        self.rv = RecycleView(viewclass=SignalRow)
+        lm = RecycleBoxLayout(orientation='vertical', spacing=dp(3), size_hint_y=None,
+                              default_size=(None, dp(30)), default_size_hint=(1, None))
+        lm.bind(minimum_height=lm.setter('height'))
+        self.rv.add_widget(lm)
+        self.add_widget(self.rv)
+    
+        self._shown = None  # (版本, 代码, 类型)
+        self._src, self._n = None, 0  # 已转换的信号列表及条数
+        self._trigger = Clock.create_trigger(self.update)
+        self.code_inp.bind(text=self._trigger)
         Clock.schedule_interval(self.update, 5)
     
+    def _next_type(self):
+        i = self.TYPES.index(self.type_btn.text)
+        self.type_btn.text = self.TYPES[(i + 1) % len(self.TYPES)]
+        self._trigger()
+    
+    @staticmethod
+    def _rows(items, code, typ):
+        """信号 -> RecycleView 数据（新的在前）"""
+        return [{'sig_time': f"{s.get('date', '')} {s.get('time', '')}", 'sig_code': s['code'],
+                 'sig_type': s['type'], 'sig_price': f"{s['price']:.2f}", 'sig_score': f"{s['score']}"}
+                for s in reversed(items)
+                if (not code or s['code'].startswith(code)) and (typ == '全部' or s['type'] == typ)]
+    
     def update(self, dt=None):
-        self.list_box.clear_widgets()
-        if not DATA.signals:
-            self.list_box.add_widget(CLabel(text='暂无历史信号', font_size=sp(12), 
-                                            color=get_color_from_hex(THEME.get('gray')), size_hint_y=None, height=dp(35)))
+        code, typ = self.code_inp.text.strip(), self.type_btn.text
+        key = (DATA.signals_version, code, typ)
+        if key == self._shown:
             return
-        
-        for s in reversed(DATA.signals[-40:]):
-            row = BoxLayout(size_hint_y=None, height=dp(30), padding=dp(4))
-            with row.canvas.before:
-                Color(*get_color_from_hex(THEME.get('card')))
-                RoundedRectangle(pos=row.pos, size=row.size, radius=[dp(4)])
-            
-            col = THEME.get('green') if s['type'] == '买入' else THEME.get('red')
-            row.add_widget(CLabel(text=s['time'], font_size=sp(10), size_hint_x=0.18))
-            row.add_widget(CLabel(text=s['code'], font_size=sp(10), size_hint_x=0.2))
-            row.add_widget(CLabel(text=s['type'], font_size=sp(10), color=get_color_from_hex(col), size_hint_x=0.15))
-            row.add_widget(CLabel(text=f"{s['price']:.2f}", font_size=sp(10), size_hint_x=0.25))
-            row.add_widget(CLabel(text=f"{s['score']}", font_size=sp(10), size_hint_x=0.12))
-            self.list_box.add_widget(row)
+        sigs = DATA.signals
+        if self._shown and self._shown[1:] == key[1:] and sigs is self._src and len(sigs) >= self._n:
+            new = self._rows(sigs[self._n:], code, typ)
+            if new:
+                self.rv.data[:0] = new
+        else:
+            self.rv.data = self._rows(sigs, code, typ)  # 筛选变化或列表被裁剪
+        self._shown, self._src, self._n = key, sigs, len(sigs)
+        rows = self.rv.data
+        self.count_lbl.text = f'{len(rows)}条'
+        if rows and self.empty_lbl.parent:
+            self.remove_widget(self.empty_lbl)
+        elif not rows and not self.empty_lbl.parent:
+            self.add_widget(self.empty_lbl, index=1)
     
     def export(self):
         if export_signals_csv():
@@ -943,9 +1324,9 @@ class SettingsPage(BoxLayout):
         # 模拟交易
         self.add_widget(CLabel(text='模拟交易:', font_size=sp(12), size_hint_y=None, height=dp(22)))
         trade_row = BoxLayout(size_hint_y=None, height=dp(35), spacing=dp(8))
-        buy_btn = CButton(text='买入20%', background_color=get_color_from_hex(THEME.get('green')), font_size=sp(12))
+        buy_btn = CButton(text='买入20%', bg_key='green', font_size=sp(12))
         buy_btn.bind(on_press=lambda x: self._sim_buy())
-        sell_btn = CButton(text='全部卖出', background_color=get_color_from_hex(THEME.get('red')), font_size=sp(12))
+        sell_btn = CButton(text='全部卖出', bg_key='red', font_size=sp(12))
         sell_btn.bind(on_press=lambda x: self._sim_sell())
         trade_row.add_widget(buy_btn)
         trade_row.add_widget(sell_btn)
@@ -953,7 +1334,7 @@ class SettingsPage(BoxLayout):
         
         # 导出交易日志
         export_btn = CButton(text='导出交易日志', size_hint_y=None, height=dp(32), font_size=sp(12),
-                            background_color=get_color_from_hex(THEME.get('purple')))
+                            bg_key='purple')
         export_btn.bind(on_press=lambda x: self._export_trades())
         self.add_widget(export_btn)
         
@@ -965,7 +1346,7 @@ class SettingsPage(BoxLayout):
         self.add_widget(float_btn)
         
         # 状态
-        self.status_lbl = CLabel(text='', font_size=sp(11), color=get_color_from_hex(THEME.get('gray')), 
+        self.status_lbl = CLabel(text='', font_size=sp(11), color_key='gray', 
                                  size_hint_y=None, height=dp(25))
         self.add_widget(self.status_lbl)
         
@@ -985,6 +1366,7 @@ class SettingsPage(BoxLayout):
             high = float(self.high_inp.text) if self.high_inp.text else None
             low = float(self.low_inp.text) if self.low_inp.text else None
             DATA.alerts[DATA.current] = {'high': high, 'low': low}
+            STATE.set('alerts', DATA.alerts)
             self.status_lbl.text = f'预警已设置: 上限={high}, 下限={low}'
         except:
             self.status_lbl.text = '请输入有效数字'
@@ -999,6 +1381,8 @@ class SettingsPage(BoxLayout):
                 'code': DATA.current, 'action': '买入',
                 'price': q['price'], 'ratio': '20%', 'profit': ''
             })
+            STATE.append('trades', DATA.trades[-1])
+            STATE.set('position', DATA.position)
             self.status_lbl.text = f"买入 {q['price']:.2f}"
     
     def _sim_sell(self):
@@ -1014,6 +1398,8 @@ class SettingsPage(BoxLayout):
                     'profit': f'{profit:+.2f}%'
                 })
                 DATA.position['hold'] = 0
+                STATE.append('trades', DATA.trades[-1])
+                STATE.set('position', DATA.position)
                 self.status_lbl.text = f"卖出 盈亏: {profit:+.2f}%"
     
     def _export_trades(self):
@@ -1040,13 +1426,16 @@ class FloatingWidget(BoxLayout):
         self.padding = dp(8)
         self.spacing = dp(4)
         
-        # 透明背景
-        self._draw_bg()
+        # 半透明黑色背景
+        with self.canvas.before:
+            Color(0, 0, 0, 0.7)
+            self._bg = RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(10)])
         self.bind(pos=self._draw_bg, size=self._draw_bg)
         
         # 股票名称 + 价格
         top = BoxLayout(size_hint_y=0.4)
-        self.name_lbl = CLabel(text='--', font_size=sp(12), bold=True, halign='left')
+        # 悬浮窗背景固定为半透明黑色，文字固定白色，不跟随主题
+        self.name_lbl = CLabel(text='--', font_size=sp(12), bold=True, halign='left', color=(1, 1, 1, 1))
         self.name_lbl.bind(size=lambda *a: setattr(self.name_lbl, 'text_size', self.name_lbl.size))
         self.price_lbl = CLabel(text='--', font_size=sp(16), bold=True, halign='right')
         self.price_lbl.bind(size=lambda *a: setattr(self.price_lbl, 'text_size', self.price_lbl.size))
@@ -1060,7 +1449,7 @@ class FloatingWidget(BoxLayout):
         self.add_widget(self.change_lbl)
         
         # 信号提示
-        self.signal_lbl = CLabel(text='', font_size=sp(13), bold=True, size_hint_y=0.35)
+        self.signal_lbl = CLabel(text='', font_size=sp(13), bold=True, size_hint_y=0.35, color=(1, 1, 1, 1))
         self.add_widget(self.signal_lbl)
         
         # 可拖拽
@@ -1068,11 +1457,7 @@ class FloatingWidget(BoxLayout):
         self.drag_offset = (0, 0)
     
     def _draw_bg(self, *a):
-        self.canvas.before.clear()
-        with self.canvas.before:
-            # 半透明黑色背景
-            Color(0, 0, 0, 0.7)
-            RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(10)])
+        self._bg.pos, self._bg.size = self.pos, self.size
     
     def on_touch_down(self, touch):
         if self.collide_point(*touch.pos):
@@ -1098,12 +1483,12 @@ class FloatingWidget(BoxLayout):
             self.price_lbl.text = f"{quote['price']:.2f}"
             c = quote.get('change', 0)
             self.change_lbl.text = f"{'+' if c>=0 else ''}{c:.2f}%"
-            col = THEME.get('green') if c>=0 else THEME.get('red')
-            self.price_lbl.color = self.change_lbl.color = get_color_from_hex(col)
+            col = 'green' if c>=0 else 'red'
+            self.price_lbl.color_key = self.change_lbl.color_key = col
         
         self.signal_lbl.text = signal_text
         if signal_color:
-            self.signal_lbl.color = get_color_from_hex(signal_color)
+            self.signal_lbl.color_key = signal_color
 
 
 # ==================== 主应用 ====================
@@ -1114,9 +1499,10 @@ class MainApp(FL):
     
     def __init__(self, **kw):
         super().__init__(**kw)
-        self._draw_bg()
+        with self.canvas.before:
+            THEME.color('bg')
+            self._bg = Rectangle(pos=self.pos, size=self.size)
         self.bind(pos=self._draw_bg, size=self._draw_bg)
-        THEME.add_listener(self._draw_bg)
         
         # 主容器（垂直布局）
         main_box = BoxLayout(orientation='vertical', size_hint=(1, 1))
@@ -1139,16 +1525,14 @@ class MainApp(FL):
         # 底部导航栏
         self.nav = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(2))
         with self.nav.canvas.before:
-            Color(*get_color_from_hex(THEME.get('card')))
+            THEME.color('card')
             self.nav_rect = Rectangle(pos=self.nav.pos, size=self.nav.size)
         self.nav.bind(pos=self._update_nav, size=self._update_nav)
         
         self.nav_btns = []
         tabs = [('行情', 0), ('自选', 1), ('信号', 2), ('设置', 3)]
         for text, idx in tabs:
-            btn = Button(text=text, font_name=FONT, font_size=sp(14),
-                        background_normal='', 
-                        background_color=get_color_from_hex(THEME.get('card')))
+            btn = CButton(text=text, font_size=sp(14), bg_key='card')
             btn.bind(on_release=lambda x, i=idx: self.switch_page(i))
             self.nav_btns.append(btn)
             self.nav.add_widget(btn)
@@ -1170,9 +1554,9 @@ class MainApp(FL):
     def _highlight_nav(self, idx):
         for i, btn in enumerate(self.nav_btns):
             if i == idx:
-                btn.color = get_color_from_hex(THEME.get('blue'))
+                btn.color_key = 'blue'
             else:
-                btn.color = get_color_from_hex(THEME.get('gray'))
+                btn.color_key = 'gray'
     
     def switch_page(self, idx):
         if idx == self.current_page:
@@ -1192,14 +1576,9 @@ class MainApp(FL):
         self.switch_page(0)  # 切换到行情页
     
     def _draw_bg(self, *a):
-        self.canvas.before.clear()
-        with self.canvas.before:
-            if self.floating_mode:
-                # 悬浮模式：完全透明背景
-                Color(0, 0, 0, 0)
-            else:
-                Color(*get_color_from_hex(THEME.get('bg')))
-            Rectangle(pos=self.pos, size=self.size)
+        self._bg.pos = self.pos
+        # 悬浮模式：不画背景（完全透明）
+        self._bg.size = (0, 0) if self.floating_mode else self.size
     
     def toggle_floating_mode(self):
         """切换悬浮窗模式"""
@@ -1214,7 +1593,7 @@ class MainApp(FL):
             self.floating.opacity = 1
             self.floating.pos = (Window.width - self.floating.width - dp(10), 
                                  Window.height - self.floating.height - dp(50))
-            Clock.schedule_interval(self._floating_update, 15)
+            ENGINE.schedule('floating', 15, self._floating_update, self._floating_apply, follow=True, delay=15)
         else:
             # 退出悬浮模式
             for child in self.children:
@@ -1222,42 +1601,47 @@ class MainApp(FL):
                     child.opacity = 1
                     child.disabled = False
             self.floating.opacity = 0
-            Clock.unschedule(self._floating_update)
+            ENGINE.cancel('floating')
         
         self._draw_bg()
     
-    def _floating_update(self, dt):
-        """悬浮窗数据更新"""
-        def f():
-            q = fetch_quote(DATA.current)
-            if q:
-                DATA.stock_cache[DATA.current] = q
-                p, v = fetch_prices(DATA.current)
-                if p:
-                    rsi = calc_rsi(p)
-                    sup, res = calc_sr(p)
-                    pat = detect_pattern(p)
-                    k, _, _ = calc_kdj(p)
-                    vol_r = calc_volume_ratio(v) if v else 1.0
-                    sc = calc_score(q['price'], sup, res, rsi, pat, k, vol_r)
-                    
-                    # 判断信号
-                    sig_text, sig_color = '', None
-                    if sc >= 70:
-                        sig_text = '📈 买入信号!'
-                        sig_color = THEME.get('green')
-                        play_sound()
-                    elif sc <= 30:
-                        sig_text = '📉 卖出信号'
-                        sig_color = THEME.get('red')
-                    
-                    Clock.schedule_once(lambda dt: self.floating.update(q, sig_text, sig_color), 0)
-        
-        threading.Thread(target=f, daemon=True).start()
+    def _floating_update(self, code):
+        """悬浮窗数据更新（引擎线程中执行）"""
+        q, qa = get_quote(code)
+        if not q:
+            return None
+        s, sa = get_prices(code, DATA.prices_cache, STORE)
+        sig = PIPELINE.evaluate(code, s, q['price'], datetime.now())
+        if not sig:
+            return q, None
+        
+        sig_text, sig_color = '', None
+        if sig.level == 'buy':
+            sig_text = '📈 买入信号!'
+            sig_color = 'green'
+        elif sig.level == 'sell':
+            sig_text = '📉 卖出信号'
+            sig_color = 'red'
+        stale = stale_text(data_age(qa, sa))
+        if stale:
+            sig_text, sig_color = (sig_text + stale).strip(), sig_color or 'gray'
+        return q, (sig.score, sig_text, sig_color)
+    
+    def _floating_apply(self, res):
+        if not res:
+            return
+        q, sig = res
+        DATA.stock_cache[q['code']] = q
+        if sig:
+            sc, sig_text, sig_color = sig
+            self.floating.update(q, sig_text, sig_color)
+            if sc >= PIPELINE.buy:
+                play_sound()
 
 
 class T0App(App):
     def build(self):
+        open_storage(self.user_data_dir)
         self.main = MainApp()
         
         # 监听键盘事件（电脑测试用，按F切换悬浮模式）
@@ -1277,6 +1661,11 @@ class T0App(App):
                 return True
         return False
     
+    def on_stop(self):
+        ENGINE.stop()
+        if STATE:
+            STATE.close()
+    
     def on_pause(self):
         """Android后台暂停时调用"""
         return True  # 返回True允许后台运行
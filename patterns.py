@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+形态扫描 - 不依赖Kivy
+对整段(可多日)分时的所有滑动窗口一次性判断形态，输出带时间的形态事件
+
+扫描: python patterns.py 600586,000001 --days 5 --root ticks
+"""
+
+import argparse
+import functools
+
+import numpy as np
+
+PATTERNS = {}  # name -> (窗口长度, 判定函数)
+
+
+def register(name, window=15):
+    """注册形态: 判定函数接收 Windows，返回每个窗口是否满足的bool数组
+
+        @register('急跌', window=5)
+        def _drop(w):
+            return (w.close - w.start) / w.start < -0.01
+    """
+    def deco(fn):
+        PATTERNS[name] = (window, fn)
+        return fn
+    return deco
+
+
+class Windows:
+    """一组长度为n的滑动窗口（每行一个窗口）及其常用统计量，按需计算"""
+
+    def __init__(self, p, n):
+        self.n = n
+        self.values = np.lib.stride_tricks.sliding_window_view(p, n)
+
+    @functools.cached_property
+    def start(self):
+        return self.values[:, 0]
+
+    @functools.cached_property
+    def close(self):
+        return self.values[:, -1]
+
+    @functools.cached_property
+    def argmin(self):
+        return self.values.argmin(axis=1)
+
+    @functools.cached_property
+    def argmax(self):
+        return self.values.argmax(axis=1)
+
+    @functools.cached_property
+    def low(self):
+        return self.values.min(axis=1)
+
+    @functools.cached_property
+    def high(self):
+        return self.values.max(axis=1)
+
+
+# ==================== 内置形态（判定口径同 detect_pattern） ====================
+@register('V型反转')
+def _v(w):
+    mi, s, l, c = w.argmin, w.start, w.low, w.close
+    return (2 < mi) & (mi < w.n - 3) & ((s-l)/s > 0.01) & ((c-l)/l > 0.008)
+
+
+@register('倒V型')
+def _inv_v(w):
+    ma, s, h, c = w.argmax, w.start, w.high, w.close
+    return (2 < ma) & (ma < w.n - 3) & ((h-s)/s > 0.01) & ((h-c)/h > 0.008)
+
+
+@register('箱体震荡')
+def _box(w):
+    return ~_v(w) & ~_inv_v(w) & ((w.high - w.low) / w.low < 0.015)
+
+
+# ==================== 扫描 ====================
+def scan(times, prices, dates=None, names=None, edge=True):
+    """扫描所有窗口，返回按时间排序的事件 [{'date','time','pattern','price'}, ...]
+
+    事件时间为窗口最后一根K线；dates 给出时跨日的窗口被排除。
+    edge=True 时连续满足的窗口只在第一次出现时记一次事件。
+    """
+    times = np.asarray(times)
+    prices = np.asarray(prices, dtype=np.float64)
+    dates = np.full(len(times), '', dtype='U6') if dates is None else np.asarray(dates)
+    found = []
+    cache = {}
+    for name in names or PATTERNS:
+        n, fn = PATTERNS[name]
+        if len(prices) < n:
+            continue
+        w = cache.get(n) or cache.setdefault(n, Windows(prices, n))
+        hit = np.asarray(fn(w), dtype=bool) & (dates[n-1:] == dates[:len(dates)-n+1])
+        if edge:
+            hit[1:] &= ~hit[:-1]
+        idx = np.flatnonzero(hit) + n - 1
+        found.append((idx, name))
+    if not found:
+        return []
+    idx = np.concatenate([i for i, _ in found])
+    pat = np.concatenate([np.full(len(i), k) for k, (i, _) in enumerate(found)])
+    order = np.lexsort((pat, idx))
+    labels = [name for _, name in found]
+    return [{'date': str(dates[i]), 'time': int(times[i]), 'pattern': labels[k], 'price': float(prices[i])}
+            for i, k in zip(idx[order].tolist(), pat[order].tolist())]
+
+
+def scan_store(store, codes, days=5, names=None):
+    """对 TickStore 中各股票最近days个交易日扫描，返回 {code: events}"""
+    out = {}
+    for code in codes:
+        dates, times, prices, _ = store.history(code, days)
+        out[code] = scan(times, prices, dates, names)
+    return out
+
+
+def main(argv=None):
+    from tick_store import TickStore
+    ap = argparse.ArgumentParser(description='分时形态扫描')
+    ap.add_argument('codes', help='逗号分隔的股票代码')
+    ap.add_argument('--days', type=int, default=5)
+    ap.add_argument('--root', default='ticks', help='TickStore目录')
+    args = ap.parse_args(argv)
+    codes = [c.strip() for c in args.codes.split(',') if c.strip()]
+    for code, events in scan_store(TickStore(args.root), codes, args.days).items():
+        for e in events:
+            print(f"{code} {e['date']} {e['time']:04d} {e['pattern']} {e['price']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
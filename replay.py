@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+行情录制与回放 - 不依赖Kivy和网络
+
+录制: python replay.py record market.log --codes 600586,000001 --interval 15
+回放: python replay.py play market.log --speed 0     (0=最快, 1=原速, N=N倍速)
+
+日志为追加写入的二进制记录，每条 = 接收时间 + URL + zlib压缩的原始响应，
+回放时原样送入与实盘相同的解析、指标和评分函数。
+"""
+
+import argparse
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from signals import SignalPipeline
+from market_data import (CLIENT, MinuteSeries, fetch_quotes, ingest_prices, ingest_minute_raw,
+                         parse_quotes_raw)
+
+MAGIC = b'T0REC1\n'
+_HDR = struct.Struct('<dHI')  # 接收时间(秒), URL长度, 压缩后body长度
+
+
+# ==================== 录制 ====================
+class Recorder:
+    """把每个原始响应追加写入日志，可直接设为 CLIENT.recorder"""
+
+    def __init__(self, path):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._f = open(path, 'ab')
+        if new:
+            self._f.write(MAGIC)
+        self._lock = threading.Lock()
+
+    def write(self, url, body, ts=None):
+        ts = time.time() if ts is None else ts
+        u = url.encode('utf-8')
+        z = zlib.compress(body, 6)
+        with self._lock:
+            self._f.write(_HDR.pack(ts, len(u), len(z)) + u + z)
+            self._f.flush()
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+
+
+def read_log(path):
+    """依次产出 (ts, url, body)；末尾不完整的记录（录制中断）被忽略"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'not a recording: {path}')
+        while True:
+            hdr = f.read(_HDR.size)
+            if len(hdr) < _HDR.size:
+                return
+            ts, ulen, zlen = _HDR.unpack(hdr)
+            data = f.read(ulen + zlen)
+            if len(data) < ulen + zlen:
+                return
+            yield ts, data[:ulen].decode('utf-8'), zlib.decompress(data[ulen:])
+
+
+def record(path, codes, interval=15, duration=None):
+    """按interval轮询codes的行情和分时并录制"""
+    CLIENT.recorder = Recorder(path)
+    cache = {}
+    end = time.time() + duration if duration else None
+    try:
+        while end is None or time.time() < end:
+            fetch_quotes(codes)
+            for code in codes:
+                try:
+                    ingest_prices(code, cache)
+                except:
+                    pass
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        CLIENT.recorder.close()
+        CLIENT.recorder = None
+
+
+# ==================== 回放 ====================
+def replay(path, speed=0, on_score=None):
+    """把日志送入 解析→指标→评分 流程，返回吞吐和延迟统计
+
+    speed=1按记录时间原速回放，N为N倍速，0为不等待；评分时刻使用记录时间，结果可重复。
+    延迟为记录应到达时刻到该记录所有评分完成的时间。
+    on_score(ts, code, price, score) 可用于收集结果。
+    """
+    series, prices = {}, {}
+    pipeline = SignalPipeline()
+    latencies = []
+    nbytes = scores = buys = sells = 0
+    t_start = time.perf_counter()
+    ts0 = None
+    for ts, url, body in read_log(path):
+        if ts0 is None:
+            ts0 = ts
+        due = t_start + (ts - ts0) / speed if speed else time.perf_counter()
+        wait = due - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        nbytes += len(body)
+        now = datetime.fromtimestamp(ts)
+        if '/minute/' in url:
+            code = url.rsplit('/', 1)[1][2:8]
+            s = series.setdefault(code, MinuteSeries())
+            ingest_minute_raw(s, body)
+            todo = [code] if code in prices else []
+        else:
+            rows = parse_quotes_raw(body)
+            prices.update(zip(rows['code'].tolist(), rows['price'].tolist()))
+            todo = [c for c in rows['code'].tolist() if c in series]
+        for code in todo:
+            s = series[code]
+            if not s.n:
+                continue
+            sc = pipeline.evaluate(code, s, prices[code], now).score  # 与悬浮窗相同的评分流程
+            scores += 1
+            buys += sc >= pipeline.buy
+            sells += sc <= pipeline.sell
+            if on_score:
+                on_score(ts, code, prices[code], sc)
+        latencies.append(time.perf_counter() - due)
+    wall = time.perf_counter() - t_start
+    lat = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        'records': len(latencies), 'bytes': nbytes, 'symbols': len(series),
+        'scores': scores, 'buy': buys, 'sell': sells, 'wall_s': wall,
+        'records_per_s': len(latencies) / wall if wall else 0,
+        'scores_per_s': scores / wall if wall else 0,
+        'lat_p50_ms': float(np.percentile(lat, 50)),
+        'lat_p99_ms': float(np.percentile(lat, 99)),
+        'lat_max_ms': float(lat.max()),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='行情录制与回放')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    rec = sub.add_parser('record', help='录制实时行情')
+    rec.add_argument('log')
+    rec.add_argument('--codes', required=True, help='逗号分隔的股票代码')
+    rec.add_argument('--interval', type=float, default=15)
+    rec.add_argument('--duration', type=float, default=None, help='录制秒数，默认直到Ctrl+C')
+    play = sub.add_parser('play', help='回放日志并统计吞吐/延迟')
+    play.add_argument('log')
+    play.add_argument('--speed', type=float, default=0, help='0=最快, 1=原速, N=N倍速')
+    args = ap.parse_args(argv)
+
+    if args.cmd == 'record':
+        record(args.log, [c.strip() for c in args.codes.split(',') if c.strip()],
+               args.interval, args.duration)
+    else:
+        for k, v in replay(args.log, args.speed).items():
+            print(f'{k:>14}: {v:.3f}' if isinstance(v, float) else f'{k:>14}: {v}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+信号流水线 - 不依赖Kivy
+分时K线 → 指标 → 形态 → 评分 → 信号；评分时刻由调用方显式传入，
+首页、悬浮窗、自选列表、回放和回测共用同一套逻辑
+"""
+
+import collections
+
+import numpy as np
+
+from indicators import SCORE_PARAMS, AnalysisCache, analyze, score_batch, score_features, score_from_features
+
+BUY, WEAK_BUY, SELL = 70, 55, 30  # 评分>=BUY 买入，>=WEAK_BUY 弱买入，<=SELL 观望/卖出
+
+# level: 'buy' / 'weak_buy' / 'sell' / 'none'；analysis 为 indicators.Analysis，批量评分时为None
+Signal = collections.namedtuple('Signal', 'code time price score level analysis')
+
+# 首页信号提示: level -> (文字, 主题颜色key)
+LEVEL_TEXT = {'buy': ("买入信号!", 'green'), 'weak_buy': ("弱买入", 'yellow'),
+              'sell': ("观望/卖出", 'red'), 'none': ("暂无信号", 'gray')}
+
+
+def signal_display(sig):
+    """首页显示用的 (评分, 提示文字, 主题颜色key)"""
+    text, col = LEVEL_TEXT[sig.level]
+    return sig.score, text, col
+
+
+def day_features(dates, times, prices, volumes):
+    """多日分时逐根的评分特征；指标每日重新计算（同App按交易日重置），等长的交易日合成矩阵一次算完"""
+    out = {}
+    if not len(prices):
+        return score_features(prices, volumes, times)
+    starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+    ends = np.r_[starts[1:], len(prices)]
+    groups = {}
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        groups.setdefault(e - s, []).append(s)
+    for n, ss in groups.items():
+        idx = np.asarray(ss)[:, None] + np.arange(n)
+        for k, x in score_features(prices[idx], volumes[idx], times[idx]).items():
+            if k not in out:
+                out[k] = np.empty(len(prices), dtype=x.dtype)
+            out[k][idx] = x
+    return out
+
+
+class SignalPipeline:
+    """评分与信号判定
+
+    evaluate 用于单只股票的实时评分（增量指标+按K线缓存的 Analysis），
+    evaluate_many 对一组股票一次向量化评分，score_history 对历史分时逐根评分。
+    所有方法都要求传入评分时刻，同样的输入总是得到同样的信号。
+    """
+
+    def __init__(self, weights=None, buy=BUY, weak_buy=WEAK_BUY, sell=SELL, states=None, cache_size=64):
+        self.weights = weights or SCORE_PARAMS
+        self.buy, self.weak_buy, self.sell = buy, weak_buy, sell
+        self.states = {} if states is None else states  # {code: IndicatorState}
+        self.cache = AnalysisCache(cache_size)
+
+    def level(self, score):
+        if score >= self.buy: return 'buy'
+        if score >= self.weak_buy: return 'weak_buy'
+        if score <= self.sell: return 'sell'
+        return 'none'
+
+    def evaluate(self, code, series, price, now):
+        """series 为 MinuteSeries，price 为最新价；无分时数据时返回None"""
+        if not series or not series.n:
+            return None
+        a = analyze(self.states, self.cache, code, series)
+        sc = a.score(price, now, self.weights)
+        return Signal(code, now, price, sc, self.level(sc), a)
+
+    def evaluate_many(self, items, now):
+        """items 为 [(code, MinuteSeries, 最新价), ...]，返回 {code: Signal}"""
+        codes, p, v, price = [], [], [], []
+        for code, s, q in items:
+            if s and s.n:
+                with s.lock:
+                    p.append(s.prices.copy())
+                    v.append(s.volumes.copy())
+                codes.append(code)
+                price.append(q)
+        scores = score_batch(p, v, price, now, self.weights)
+        return {c: Signal(c, now, q, sc, self.level(sc), None) for c, q, sc in zip(codes, price, scores)}
+
+    def score_history(self, dates, times, prices, volumes):
+        """历史分时逐根评分（评分时刻取各K线时间，价格取收盘价），指标按交易日重置"""
+        return score_from_features(day_features(dates, times, prices, volumes), self.weights)
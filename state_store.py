@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+应用状态持久化 - 不依赖Kivy
+追加写变更日志，后台定期压缩成快照；启动时顺序读一个文件即可恢复
+"""
+
+import copy
+import os
+import pickle
+import queue
+import threading
+
+_PROTO = 4
+
+
+class StateJournal:
+    """状态日志
+
+    文件由连续的pickle记录组成：第一条是快照 {key: value}，之后每条是一次变更
+    (op, key, value)，op 为 set / append / trim。
+    set/append/trim 只在调用线程序列化后入队，文件写入和压缩都在后台线程进行，不阻塞UI。
+    """
+
+    def __init__(self, path, compact_every=2000):
+        self.path = path
+        self.compact_every = compact_every  # 快照之后累计多少条变更触发压缩
+        self._defaults = {}
+        self._state = {}
+        self._ops = 0
+        self._q = queue.Queue()
+        self._thread = None
+
+    # ---------- 启动 ----------
+    def load(self, defaults):
+        """读取快照和其后的变更，返回恢复后的状态（缺失的key取defaults）"""
+        self._defaults = copy.deepcopy(defaults)
+        state, ops, valid = self._read()
+        try:
+            if valid != os.path.getsize(self.path):
+                # 写入中断留下的残缺记录，截掉以免后续追加接在坏数据后面
+                with open(self.path, 'r+b') as f:
+                    f.truncate(valid)
+        except OSError:
+            pass
+        if not valid or ops >= self.compact_every:
+            self._q.put(('compact',))
+        self._thread = threading.Thread(target=self._writer, name='state-journal', daemon=True)
+        self._thread.start()
+        return state
+
+    def _read(self):
+        """顺序读一遍文件，返回 (state, 变更条数, 有效字节数)"""
+        state = copy.deepcopy(self._defaults)
+        ops = valid = 0
+        try:
+            with open(self.path, 'rb') as f:
+                try:
+                    state.update(pickle.load(f))
+                    valid = f.tell()
+                    while True:
+                        self._apply(state, pickle.load(f))
+                        ops += 1
+                        valid = f.tell()
+                except Exception:
+                    pass  # EOF 或残缺记录
+        except OSError:
+            pass
+        return state, ops, valid
+
+    @staticmethod
+    def _apply(state, rec):
+        op, key, value = rec
+        if op == 'set':
+            state[key] = value
+        elif op == 'append':
+            state.setdefault(key, []).append(value)
+        elif op == 'trim':
+            state[key] = state.get(key, [])[-value:]
+
+    # ---------- 变更（任意线程） ----------
+    def set(self, key, value):
+        self._q.put(pickle.dumps(('set', key, value), _PROTO))
+
+    def append(self, key, item):
+        self._q.put(pickle.dumps(('append', key, item), _PROTO))
+
+    def trim(self, key, keep):
+        self._q.put(pickle.dumps(('trim', key, keep), _PROTO))
+
+    def close(self):
+        if self._thread:
+            self._q.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # ---------- 后台线程 ----------
+    def _writer(self):
+        # 压缩用的状态副本在后台重新读文件得到，不在启动路径上拷贝
+        self._state, self._ops, _ = self._read()
+        f = open(self.path, 'ab')
+        try:
+            while True:
+                item = self._q.get()
+                if item is None:
+                    break
+                if isinstance(item, bytes):
+                    f.write(item)
+                    self._apply(self._state, pickle.loads(item))
+                    self._ops += 1
+                    if self._q.empty():
+                        f.flush()
+                if item == ('compact',) or self._ops >= self.compact_every:
+                    f.close()
+                    self._compact()
+                    f = open(self.path, 'ab')
+        finally:
+            f.close()
+
+    def _compact(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self._state, f, _PROTO)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._ops = 0
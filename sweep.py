@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+评分参数搜索 - 不依赖Kivy和网络
+评分特征只与行情有关，先对全部股票算一次放进共享内存，各进程直接映射，
+每组参数只需重新加权并模拟仓位。
+
+网格: python sweep.py --root ticks --days 60
+随机: python sweep.py 600586,000001 --days 20 --random 2000 --top 30
+"""
+
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import STEP, simulate
+from indicators import SCORE_PARAMS, score_from_features
+from signals import BUY, SELL, day_features
+from tick_store import TickStore
+
+FEATURES = ('rsi', 'sr_ok', 'pos', 'v_flag', 'box', 'k', 'vol_r', 'in_time')
+
+# 搜索空间: 每个key的候选值；未列出的权重取 SCORE_PARAMS，buy/sell 为信号阈值
+GRID = {
+    'rsi_pts': [(25, 18, 8), (30, 20, 10), (20, 12, 5)],
+    'pos_pts': [(20, 12, 4), (25, 15, 5), (15, 8, 2)],
+    'v_pts': [10, 20, 30],
+    'k_pts': [(15, 10), (20, 12), (10, 5)],
+    'vol_pts': [(10, 5), (15, 8), (5, 2)],
+    'time_pts': [0, 10],
+    'buy': [65, 70, 75],
+    'sell': [25, 30, 35],
+}
+
+
+def grid(space=GRID):
+    keys = list(space)
+    return [dict(zip(keys, vals)) for vals in itertools.product(*space.values())]
+
+
+def sample(n, space=GRID, seed=0):
+    """从搜索空间随机抽取n组（不重复）"""
+    rnd = random.Random(seed)
+    total = np.prod([len(v) for v in space.values()])
+    seen, out = set(), []
+    while len(out) < min(n, total):
+        pick = tuple(rnd.randrange(len(v)) for v in space.values())
+        if pick not in seen:
+            seen.add(pick)
+            out.append({k: v[i] for (k, v), i in zip(space.items(), pick)})
+    return out
+
+
+# ==================== 共享数据 ====================
+def load(root, codes, days=60):
+    """读取各股票历史并计算评分特征，返回 (矩阵[特征..., 价格], 每根K线所属段起点, 股票数)"""
+    store = TickStore(root)
+    parts, seg, n, count = [], [], 0, 0
+    for code in codes:
+        dates, times, prices, volumes = store.history(code, days)
+        if not len(prices):
+            continue
+        f = day_features(dates, times, prices, volumes)
+        parts.append(np.vstack([f[k] for k in FEATURES] + [prices]).astype(np.float64))
+        seg.append(np.full(len(prices), n, dtype=np.int64))
+        n += len(prices)
+        count += 1
+    if not parts:
+        return np.zeros((len(FEATURES) + 1, 0)), np.zeros(0, dtype=np.int64), 0
+    return np.hstack(parts), np.concatenate(seg), count
+
+
+_SHM = {}  # 子进程中映射的共享内存
+
+
+def _attach(names, shapes):
+    for key, name, shape in zip(('data', 'seg'), names, shapes):
+        shm = shared_memory.SharedMemory(name=name)
+        dtype = np.float64 if key == 'data' else np.int64
+        _SHM[key] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+
+def _evaluate(params):
+    data, seg = _SHM['data'][1], _SHM['seg'][1]
+    f = {k: data[i] for i, k in enumerate(FEATURES)}
+    for k in ('sr_ok', 'v_flag', 'box', 'in_time'):
+        f[k] = f[k] != 0
+    w = dict(SCORE_PARAMS, **{k: v for k, v in params.items() if k in SCORE_PARAMS})
+    prices = data[-1]
+    scores = score_from_features(f, w)
+    profit, ratio, hold, equity = simulate(prices, scores, params.get('buy', BUY), params.get('sell', SELL),
+                                           params.get('step', STEP), seg)
+    # 各股票最大回撤: 按段偏移后做一次累计最大值（段号递增，偏移远大于净值范围）
+    starts = np.unique(seg)
+    sid = np.searchsorted(starts, seg)
+    shifted = equity + sid * 1e9
+    peak = np.maximum(np.maximum.accumulate(shifted), sid * 1e9)
+    prev = np.r_[0, hold[:-1]]
+    prev[starts] = 0
+    return {
+        'trades': len(profit), 'profit': float(profit.sum()), 'weighted': float((profit * ratio).sum()),
+        'win_rate': float((profit > 0).mean()) if len(profit) else 0.0,
+        'max_dd': float((peak - shifted).max()) if len(seg) else 0.0,
+        'turnover': float(np.abs(hold - prev).sum()),
+    }
+
+
+def sweep(root, codes, param_sets, days=60, workers=None):
+    """多进程评估所有参数组合，返回按总盈亏降序的 [(params, 结果), ...]"""
+    data, seg, nsym = load(root, codes, days)
+    shms = []
+    try:
+        for arr in (data, seg):
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            shms.append(shm)
+        names, shapes = [s.name for s in shms], [data.shape, seg.shape]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(names, shapes)) as ex:
+            results = list(ex.map(_evaluate, param_sets, chunksize=8))
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+    for r in results:
+        r['symbols'] = nsym
+    return sorted(zip(param_sets, results), key=lambda x: -x[1]['profit'])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='评分权重/阈值参数搜索')
+    ap.add_argument('codes', nargs='?', default='', help='逗号分隔的股票代码，默认TickStore中全部')
+    ap.add_argument('--root', default='ticks', help='TickStore目录')
+    ap.add_argument('--days', type=int, default=60)
+    ap.add_argument('--workers', type=int, default=None, help='进程数，默认CPU核数')
+    ap.add_argument('--random', type=int, default=0, help='随机抽取N组，默认完整网格')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--top', type=int, default=20)
+    args = ap.parse_args(argv)
+    if not os.path.isdir(args.root):
+        ap.error(f'TickStore目录不存在: {args.root}（用 --root 指定）')
+    codes = [c.strip() for c in args.codes.split(',') if c.strip()] or sorted(os.listdir(args.root))
+    if not codes:
+        ap.error(f'{args.root} 中没有股票数据')
+    sets = sample(args.random, seed=args.seed) if args.random else grid()
+    t = time.perf_counter()
+    ranked = sweep(args.root, codes, sets, args.days, args.workers)
+    print(f'{len(sets)}组参数 x {len(codes)}只股票, 用时 {time.perf_counter() - t:.1f}s')
+    print(f"{'排名':>4} {'盈亏%':>9} {'加权%':>8} {'交易':>6} {'胜率':>6} {'回撤':>6} {'换手':>8}  参数")
+    for i, (p, r) in enumerate(ranked[:args.top], 1):
+        print(f"{i:4d} {r['profit']:+9.2f} {r['weighted']:+8.2f} {r['trades']:6d} {r['win_rate']*100:5.1f}% "
+              f"{r['max_dd']:6.2f} {r['turnover']:8.1f}  {p}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from backtest import run, simulate
+from tick_store import TickStore
+
+
+def _reference(prices, scores, buy, sell, step, seg):
+    """逐根执行 _sim_buy/_sim_sell 规则"""
+    profit, ratio, hold, equity = [], [], [], []
+    for i, (p, sc) in enumerate(zip(prices, scores)):
+        if i == 0 or seg[i] != seg[i-1]:
+            nb, cost, realized = 0, 0.0, 0.0
+        if sc >= buy:
+            nb, cost = nb + 1, p
+        elif sc <= sell and nb:
+            profit.append((p - cost) / cost * 100)
+            ratio.append(min(step * nb, 1.0))
+            realized += profit[-1]
+            nb = 0
+        pos = min(step * nb, 1.0)
+        hold.append(pos)
+        equity.append(realized + ((p - cost) / cost * 100 if pos > 0 else 0))
+    return np.array(profit), np.array(ratio), np.array(hold), np.array(equity)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_simulate_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    n = 2000
+    prices = 10 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    scores = rng.integers(0, 101, n)
+    seg = np.repeat([0, 700, 1500], [700, 800, 500])
+    for buy, sell, step in ((70, 30, 0.2), (60, 40, 0.3), (90, 10, 1.0)):
+        got = simulate(prices, scores, buy, sell, step, seg)
+        for g, r in zip(got, _reference(prices, scores, buy, sell, step, seg)):
+            assert g == pytest.approx(r)
+
+
+def test_simulate_edge_cases():
+    p = np.array([10.0, 11.0, 12.0])
+    profit, ratio, hold, equity = simulate(p, np.array([20, 20, 20]))  # 无持仓时的卖出信号
+    assert not len(profit) and not hold.any() and not equity.any()
+    profit, ratio, hold, equity = simulate(p, np.array([80, 80, 80]))  # 只买不卖
+    assert not len(profit) and hold.tolist() == pytest.approx([0.2, 0.4, 0.6])
+    assert equity[-1] == 0  # 成本记为最近一次买价
+
+
+def test_run_parallel_equals_serial(tmp_path):
+    st = TickStore(str(tmp_path))
+    rng = np.random.default_rng(0)
+    times = [h * 100 + m for h in (9, 10, 11, 13, 14) for m in range(60)
+             if 930 <= h * 100 + m <= 1130 or 1300 < h * 100 + m <= 1459] + [1500]
+    for code in ('600000', '000001', '000002'):
+        for d in ('261014', '261015', '261016'):
+            st.append(code, d, times, 10 * np.exp(np.cumsum(rng.normal(0, 0.003, len(times)))),
+                      rng.integers(100, 5000, len(times)).astype(float))
+    serial, total = run(str(tmp_path), workers=1)
+    parallel, total2 = run(str(tmp_path), workers=2)
+    assert serial == parallel and total == total2
+    assert [r['code'] for r in serial] == ['000001', '000002', '600000']
+    assert total['bars'] == 3 * 3 * len(times)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+from data_engine import DataEngine
+
+
+def _wait(cond, timeout=2):
+    end = time.time() + timeout
+    while not cond() and time.time() < end:
+        time.sleep(0.01)
+    return cond()
+
+
+def test_switch_drops_in_flight_result():
+    """切换后仍在线程池里的旧股票请求会跑完，但结果不派发"""
+    cur = ['600000']
+    eng = DataEngine(current=lambda: cur[0])
+    started, release, finished = threading.Event(), threading.Event(), threading.Event()
+    got = []
+
+    def fetch(code):
+        started.set()
+        release.wait(2)
+        finished.set()
+        return code
+
+    try:
+        eng.submit('quote', fetch, got.append, follow=True)
+        assert started.wait(2)
+        cur[0] = '000001'
+        eng.switch('000001')
+        time.sleep(0.05)
+        release.set()
+        assert finished.wait(2)
+        time.sleep(0.05)
+        assert not eng._results  # 任务已取消，结果没有入队
+        eng.drain()
+        assert got == []
+    finally:
+        eng.stop()
+
+
+def test_drain_drops_queued_result_of_old_code():
+    cur = ['600000']
+    eng = DataEngine(current=lambda: cur[0])
+    got = []
+    try:
+        eng.submit('quote', lambda code: code, got.append, follow=True)
+        assert _wait(lambda: len(eng._results) == 1)
+        cur[0] = '000001'
+        eng.drain()
+        assert got == []
+        eng.submit('quote', lambda code: code, got.append, follow=True)
+        eng.submit('other', lambda: 'x', got.append)
+        assert _wait(lambda: len(eng._results) == 2)
+        eng.drain()
+        assert sorted(got) == ['000001', 'x']
+    finally:
+        eng.stop()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from indicators import (IndicatorState, RollingWindow, calc_boll, calc_kdj, calc_ma, calc_macd, calc_rsi,
+                        calc_sr, calc_volume_ratio, detect_pattern, ema_series, kdj_series, macd_series,
+                        rsi_series)
+from market_data import MinuteSeries
+
+
+def _walk(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    p = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.003, n))), 2)
+    p[100:112] = p[99]  # 一段平盘
+    v = rng.integers(100, 5000, n).astype(float)
+    return p.tolist(), v.tolist()
+
+
+def _series(p, v, date='261016'):
+    s = MinuteSeries()
+    s.reset(date)
+    s.append(np.arange(len(p)), np.array(p), np.array(v))
+    return s
+
+
+def test_rolling_window_matches_numpy():
+    x = np.random.default_rng(1).normal(10, 2, 200)
+    for n in (1, 5, 15):
+        w = RollingWindow(n, extremes=True)
+        for i, xi in enumerate(x):
+            w.push(xi)
+            seg = x[max(0, i - n + 1):i + 1]
+            assert w.full == (i + 1 >= n)
+            assert w.mean == pytest.approx(seg.mean())
+            assert w.std == pytest.approx(seg.std(), abs=1e-6)
+            assert (w.low, w.high) == (seg.min(), seg.max())
+
+
+def test_ema_and_series_match_calc():
+    p, _ = _walk()
+    a = 2 / 13
+    ref = [p[0]]
+    for x in p[1:]:
+        ref.append(a * x + (1 - a) * ref[-1])
+    assert ema_series(p, 12) == pytest.approx(ref)
+    m, s, h = macd_series(p)
+    r = rsi_series(p)
+    for i in (26, 100, 299):
+        assert calc_macd(p[:i+1]) == pytest.approx((round(m[i], 4), round(s[i], 4), round(h[i], 4)), abs=1e-4)
+        assert calc_rsi(p[:i+1]) == pytest.approx(round(r[i], 1), abs=0.1)
+
+
+def test_state_matches_calc_functions():
+    p, v = _walk()
+    st = IndicatorState()
+    for i in range(len(p)):
+        st.push(p[i], v[i])
+        q, u = p[:i+1], v[:i+1]
+        assert st.rsi() == pytest.approx(calc_rsi(np.array(q)), abs=0.11)
+        assert st.macd() == pytest.approx(calc_macd(q), abs=1.1e-4)
+        assert st.ma(5) == pytest.approx(calc_ma(q, 5), abs=0.011)
+        assert st.ma(20) == pytest.approx(calc_ma(q, 20), abs=0.011)
+        assert st.boll() == pytest.approx(calc_boll(q), abs=0.011)
+        assert st.sr() == calc_sr(q)
+        assert st.volume_ratio() == pytest.approx(calc_volume_ratio(u), abs=0.011)
+        assert st.pattern() == detect_pattern(np.array(q))
+
+
+def test_sync_incremental_equals_batch():
+    p, v = _walk()
+    st, s = IndicatorState(), MinuteSeries()
+    s.reset('261016')
+    for i in range(0, len(p), 17):
+        s.append(np.arange(i, min(i + 17, len(p))), np.array(p[i:i+17]), np.array(v[i:i+17]))
+        s._p[s.n-1] += 0.05  # 最后一分钟先是临时值，随后被改写
+        st.sync(s)
+        s._p[s.n-1] -= 0.05
+        st.sync(s)
+        ref = IndicatorState()
+        ref.sync(_series(p[:s.n], v[:s.n]))
+        assert st.analysis() == ref.analysis()
+
+
+def test_sync_resets_on_new_day():
+    p, v = _walk()
+    st = IndicatorState()
+    st.sync(_series(p, v))
+    st.sync(_series(p[:50], v[:50], '261017'))
+    ref = IndicatorState()
+    ref.sync(_series(p[:50], v[:50], '261017'))
+    assert st.n == 50 and st.analysis() == ref.analysis()
+
+
+def _kdj_reference(p, n=9):
+    """KDJ(n,3,3) 逐根递推：K = 2/3*K + 1/3*RSV, D = 2/3*D + 1/3*K，初值50"""
+    k = d = 50.0
+    out = []
+    for i in range(len(p)):
+        if i < n - 1:
+            out.append((np.nan, np.nan, np.nan))
+            continue
+        w = p[i-n+1:i+1]
+        lo, hi = min(w), max(w)
+        rsv = 50.0 if hi == lo else (p[i] - lo) / (hi - lo) * 100
+        k = 2/3 * k + rsv / 3
+        d = 2/3 * d + k / 3
+        out.append((k, d, 3*k - 2*d))
+    return np.array(out).T
+
+
+def test_kdj_series_matches_reference():
+    for seed in range(3):
+        p, _ = _walk(seed=seed)
+        ref = _kdj_reference(p)
+        got = np.array(kdj_series(p))
+        assert np.allclose(got, ref, equal_nan=True)
+        assert calc_kdj(p) == pytest.approx(tuple(round(x, 1) for x in ref[:, -1]), abs=0.11)
+    assert calc_kdj([1.0] * 8) == (50, 50, 50)
+    assert np.allclose(np.array(kdj_series([5.0] * 20))[:, 8:], 50)
+
+
+def test_kdj_batch_and_state():
+    p, _ = _walk()
+    ref = _kdj_reference(p)
+    batch = np.array(kdj_series(np.array([p, p[::-1]])))
+    assert np.allclose(batch[:, 0], ref, equal_nan=True)
+    st = IndicatorState()
+    for i, x in enumerate(p):
+        st.push(x)
+        if i >= 8:
+            assert (st.k, st.d) == pytest.approx((ref[0, i], ref[1, i]))
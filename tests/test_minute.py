@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from bench import make_minute_payload, old_minute_parse
+from market_data import MinuteSeries, _parse_minute_rows, ingest_minute_raw, parse_minute_raw
+
+
+def _lines(raw):
+    return raw.decode('ascii').split('\\n\\\n')
+
+
+def _join(lines):
+    return '\\n\\\n'.join(lines).encode('ascii')
+
+
+def test_matches_legacy_parser():
+    for seed in range(5):
+        raw = make_minute_payload(240, seed)
+        date, t, p, v = parse_minute_raw(raw)
+        assert date == '261016'
+        assert t.dtype == np.int32 and len(t) == 240
+        assert (p.tolist(), v.tolist()) == old_minute_parse(raw)
+        rows = _parse_minute_rows(raw.decode('ascii').split('\\n\\')[2:])
+        assert (t.tolist(), p.tolist(), v.tolist()) == rows
+
+
+def test_skip_and_after():
+    raw = make_minute_payload(240)
+    _, t, p, v = parse_minute_raw(raw)
+    for k in (1, 100, 239):
+        _, t2, p2, v2 = parse_minute_raw(raw, k, int(t[k-1]))
+        assert t2.tolist() == t[k:].tolist() and p2.tolist() == p[k:].tolist() and v2.tolist() == v[k:].tolist()
+    # skip 与 after 对不上时退回整体转换，仍只返回晚于after的分钟
+    _, t2, _, _ = parse_minute_raw(raw, 50, int(t[99]))
+    assert t2.tolist() == t[100:].tolist()
+    _, t2, _, _ = parse_minute_raw(raw, 0, int(t[-1]))
+    assert not len(t2)
+
+
+def test_irregular_rows_fall_back():
+    lines = _lines(make_minute_payload(30))
+    lines[5] += ' 1'       # 多一列
+    lines[8] = '0938 - 100'  # 非数字
+    raw = _join(lines)
+    _, t, p, v = parse_minute_raw(raw)
+    assert (t.tolist(), p.tolist(), v.tolist()) == _parse_minute_rows(raw.decode('ascii').split('\\n\\')[2:])
+    assert len(t) == 29
+
+
+def test_empty_and_partial():
+    assert parse_minute_raw(b'')[0] == ''
+    date, t, _, _ = parse_minute_raw(b'min_data="\\n\\\ndate:261016\\n\\\n";')
+    assert date == '261016' and not len(t)
+    lines = _lines(make_minute_payload(10))
+    raw = _join(lines[:-2]) + b'\\n\\\n' + lines[-2][:6].encode('ascii')  # 最后一行被截断
+    assert len(parse_minute_raw(raw)[1]) == 9
+
+
+def test_incremental_ingest_with_rewritten_tail():
+    """逐步变长、最后一行不断被改写的文件，增量结果与整体解析一致"""
+    lines = _lines(make_minute_payload(240))
+    head, body = lines[:2], lines[2:-1]
+    s = MinuteSeries(capacity=16)
+    for n in range(1, 241, 7):
+        cur = list(body[:n])
+        t, p, v = cur[-1].split(' ')
+        cur[-1] = f'{t} {float(p) + 0.01:.2f} {int(v) - 1}'  # 这一分钟还没结束
+        ingest_minute_raw(s, _join(head + cur + ['";']))
+        ingest_minute_raw(s, _join(head + body[:n] + ['";']))
+        _, t, p, v = parse_minute_raw(_join(head + body[:n] + ['";']))
+        assert s.times.tolist() == t.tolist()
+        assert s.prices.tolist() == p.tolist() and s.volumes.tolist() == v.tolist()
+
+
+def test_new_day_resets_series():
+    s = MinuteSeries()
+    ingest_minute_raw(s, make_minute_payload(50))
+    raw = make_minute_payload(10, seed=1).replace(b'date:261016', b'date:261017')
+    ingest_minute_raw(s, raw)
+    assert s.date == '261017' and s.n == 10
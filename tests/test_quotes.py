@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from bench import make_quote_payload, old_quote_parse
+from market_data import QUOTE_DTYPE, parse_quotes_raw
+
+TILDE_NAME = '儈科技'  # '儈' 的GBK尾字节为0x7E('~')
+
+
+def _rows(arr):
+    return {r['code']: r for r in (dict(zip(QUOTE_DTYPE.names, row)) for row in arr.tolist())}
+
+
+def _edit(raw, lineno, **fields):
+    """改写第lineno行的若干字段 {序号: 文本}"""
+    lines = raw.decode('gbk').split('\n')
+    head, body = lines[lineno].split('="')
+    p = body.rstrip(';"').split('~')
+    for j, v in fields.items():
+        p[int(j[1:])] = v
+    lines[lineno] = head + '="' + '~'.join(p) + '";'
+    return '\n'.join(lines).encode('gbk')
+
+
+def test_matches_legacy_parser():
+    for n in (1, 60, 200):
+        raw = make_quote_payload(n, seed=n)
+        assert _rows(parse_quotes_raw(raw)) == old_quote_parse(raw)
+
+
+def test_gbk_name_with_tilde_byte():
+    raw = _edit(make_quote_payload(20), 3, f1=TILDE_NAME)
+    assert TILDE_NAME.encode('gbk')[1] == ord('~')
+    got = _rows(parse_quotes_raw(raw))
+    assert got == old_quote_parse(raw)
+    assert TILDE_NAME in [q['name'] for q in got.values()]
+
+
+def test_bad_numeric_field_drops_only_that_line():
+    raw = make_quote_payload(30)
+    ref = old_quote_parse(raw)
+    bad = _edit(raw, 5, f3='-')
+    code = bad.decode('gbk').split('\n')[5].split('~')[2]
+    got = _rows(parse_quotes_raw(bad))
+    assert code not in got
+    assert got == {c: q for c, q in ref.items() if c != code}
+
+
+def test_empty_field_is_zero_and_out_is_reused():
+    raw = _edit(make_quote_payload(10), 2, f32='')
+    out = np.zeros(64, dtype=QUOTE_DTYPE)
+    got = parse_quotes_raw(raw, out)
+    assert got.base is out or got.base is out.base
+    assert _rows(got) == old_quote_parse(raw)
+    assert 0.0 in got['change']
+
+
+def test_truncated_payload():
+    raw = make_quote_payload(10)
+    last = raw.rindex(b'\n', 0, -1) + 1
+    cut = raw[:last + 40]  # 最后一行只剩前几个字段
+    ref = old_quote_parse(raw)
+    del ref[raw[last:].decode('gbk').split('~')[2]]
+    assert _rows(parse_quotes_raw(cut)) == ref
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from market_data import MinuteSeries
+from signals import LEVEL_TEXT, SignalPipeline, signal_display
+
+
+def _series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    s = MinuteSeries()
+    s.reset('261016')
+    s.append(np.arange(n), 10 * np.exp(np.cumsum(rng.normal(0, 0.003, n))), rng.integers(100, 5000, n).astype(float))
+    return s
+
+
+@pytest.mark.parametrize('n', [1, 20, 25, 26, 120])
+def test_evaluate_then_display(n):
+    """首页刷新的路径：不足26根时 macd 为整数0，Signal 仍可取评分和级别"""
+    s = _series(n)
+    sig = SignalPipeline().evaluate('600000', s, float(s.prices[-1]), datetime(2026, 10, 16, 10, 0))
+    _, _, hist = sig.analysis.macd
+    assert isinstance(hist, (int, float))
+    sc, text, col = signal_display(sig)
+    assert sc == sig.score and 0 <= sc <= 100
+    assert (text, col) == LEVEL_TEXT[sig.level]
+
+
+def test_every_level_has_text():
+    pipe = SignalPipeline()
+    levels = {pipe.level(sc) for sc in range(101)}
+    assert levels == set(LEVEL_TEXT)
+    base = pipe.evaluate('600000', _series(30), 10.0, datetime(2026, 10, 16, 10, 0))
+    for score in (pipe.buy, pipe.weak_buy, pipe.sell, 50):
+        sig = base._replace(score=score, level=pipe.level(score))
+        assert signal_display(sig) == (score,) + LEVEL_TEXT[pipe.level(score)]
+
+
+def test_no_data():
+    assert SignalPipeline().evaluate('600000', MinuteSeries(), 10.0, datetime(2026, 10, 16, 10, 0)) is None
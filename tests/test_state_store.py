@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import os
+import pickle
+
+from state_store import StateJournal
+
+DEFAULTS = {'watchlist': ['600586'], 'signals': [], 'position': {'hold': 0}}
+
+
+def _open(path, **kw):
+    j = StateJournal(str(path), **kw)
+    return j, j.load(DEFAULTS)
+
+
+def _records(path):
+    out = []
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                out.append(pickle.load(f))
+            except EOFError:
+                return out
+
+
+def _mutate(j, n):
+    for i in range(n):
+        j.append('signals', {'i': i})
+    j.trim('signals', 3)
+    j.set('position', {'hold': 0.4})
+
+
+def test_replay_after_reopen(tmp_path):
+    path = tmp_path / 'state.dat'
+    j, state = _open(path)
+    assert state == DEFAULTS and state['signals'] is not DEFAULTS['signals']
+    _mutate(j, 5)
+    j.close()
+    recs = _records(path)
+    assert recs[0] == DEFAULTS and len(recs) == 1 + 7  # 快照 + 7条变更
+    j, state = _open(path)
+    j.close()
+    assert state['signals'] == [{'i': 2}, {'i': 3}, {'i': 4}]
+    assert state['position'] == {'hold': 0.4} and state['watchlist'] == ['600586']
+
+
+def test_compaction(tmp_path):
+    path = tmp_path / 'state.dat'
+    j, _ = _open(path, compact_every=4)
+    _mutate(j, 10)
+    j.close()
+    assert len(_records(path)) < 5
+    j, state = _open(path, compact_every=4)
+    j.close()
+    assert state['signals'] == [{'i': 7}, {'i': 8}, {'i': 9}] and state['position'] == {'hold': 0.4}
+    assert not os.path.exists(str(path) + '.tmp')
+
+
+def test_torn_last_record_after_crash(tmp_path):
+    path = tmp_path / 'state.dat'
+    j, _ = _open(path)
+    _mutate(j, 5)
+    j.close()
+    with open(path, 'ab') as f:  # 写最后一条时断电，只落盘一部分
+        f.write(pickle.dumps(('append', 'signals', {'i': 99}), 4)[:-3])
+    size = os.path.getsize(path)
+    j, state = _open(path)
+    assert os.path.getsize(path) < size  # 残缺记录被截掉
+    assert state['signals'] == [{'i': 2}, {'i': 3}, {'i': 4}]
+    j.append('signals', {'i': 5})
+    j.close()
+    j, state = _open(path)
+    j.close()
+    assert state['signals'][-1] == {'i': 5}
+
+
+def test_missing_or_garbage_file(tmp_path):
+    path = tmp_path / 'state.dat'
+    path.write_bytes(b'\x00garbage')
+    j, state = _open(path)
+    j.set('watchlist', ['000001'])
+    j.close()
+    assert state == DEFAULTS
+    j, state = _open(path)
+    j.close()
+    assert state['watchlist'] == ['000001']
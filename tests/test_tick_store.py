@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+
+from tick_store import COLUMNS, TickStore
+
+
+def _day(st, code, date):
+    return [a.tolist() for a in st.day(code, date)]
+
+
+def test_append_skips_old_and_overwrites_last(tmp_path):
+    st = TickStore(str(tmp_path))
+    assert st.append('600000', '261016', [930, 931, 932], [10.0, 10.1, 10.2], [1, 2, 3]) == 3
+    assert st.append('600000', '261016', [930, 931], [9.0, 9.0], [9, 9]) == 0
+    # 932被改写，933为新增
+    assert st.append('600000', '261016', [931, 932, 933], [9.0, 10.25, 10.3], [9, 30, 4]) == 2
+    assert _day(st, '600000', '261016') == [[930, 931, 932, 933], [10.0, 10.1, 10.25, 10.3], [1, 2, 30, 4]]
+    # 重启后 _last 从文件恢复
+    st = TickStore(str(tmp_path))
+    assert st.append('600000', '261016', [933, 934], [10.35, 10.4], [5, 6]) == 2
+    assert _day(st, '600000', '261016')[1] == [10.0, 10.1, 10.25, 10.35, 10.4]
+
+
+def test_history_and_dates(tmp_path):
+    st = TickStore(str(tmp_path))
+    for d, base in (('261014', 1.0), ('261015', 2.0), ('261016', 3.0)):
+        st.append('000001', d, [930, 931], [base, base + 0.5], [1, 1])
+    assert st.dates('000001') == ['261014', '261015', '261016']
+    dates, times, prices, _ = st.history('000001', 2)
+    assert dates.tolist() == ['261015', '261015', '261016', '261016']
+    assert prices.tolist() == [2.0, 2.5, 3.0, 3.5] and times.tolist() == [930, 931, 930, 931]
+    assert st.history('000001', 5, before='261015')[2].tolist() == [1.0, 1.5]
+    assert len(st.history('999999')[0]) == 0
+
+
+def test_torn_columns_recovered(tmp_path):
+    """写到一半中断：部分列多了整行或半行，重启后按最短列读取，下次写入前截齐"""
+    st = TickStore(str(tmp_path))
+    st.append('600000', '261016', [930, 931], [10.0, 10.1], [1, 2])
+    with open(st._path('600000', '261016', 'time'), 'ab') as f:
+        f.write(np.int32(932).tobytes())   # time列写完了
+    with open(st._path('600000', '261016', 'price'), 'ab') as f:
+        f.write(np.float64(10.2).tobytes()[:5])  # price列只写了半个值，volume列没写
+    st = TickStore(str(tmp_path))
+    assert _day(st, '600000', '261016') == [[930, 931], [10.0, 10.1], [1, 2]]
+    assert st.append('600000', '261016', [930, 931, 932], [10.0, 10.11, 10.2], [1, 3, 4]) == 2
+    assert _day(st, '600000', '261016') == [[930, 931, 932], [10.0, 10.11, 10.2], [1, 3, 4]]
+    for col, dt in COLUMNS:
+        assert os.path.getsize(st._path('600000', '261016', col)) == 3 * dt.itemsize
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+分时列式存储 - 不依赖Kivy
+目录结构: <root>/<code>/<YYMMDD>.time|.price|.volume
+每列一个定长二进制文件，读取时用 numpy.memmap 直接映射，不拷贝不解析
+"""
+
+import os
+import threading
+
+import numpy as np
+
+COLUMNS = (('time', np.dtype(np.int32)), ('price', np.dtype(np.float64)), ('volume', np.dtype(np.float64)))
+
+
+class TickStore:
+    """按 股票/交易日 存放分时数据；append 追加比已存最后一分钟更新的数据，并覆盖最后一分钟"""
+
+    def __init__(self, root):
+        self.root = root
+        self._last = {}  # (code, date) -> 已写入的最后时间HHMM
+        self._lock = threading.Lock()
+
+    def _path(self, code, date, col):
+        return os.path.join(self.root, code, f'{date}.{col}')
+
+    def _rows(self, code, date):
+        """各列完整记录数（取最小值，忽略中断写入留下的残缺尾部）"""
+        n = None
+        for col, dt in COLUMNS:
+            try:
+                k = os.path.getsize(self._path(code, date, col)) // dt.itemsize
+            except OSError:
+                return 0
+            n = k if n is None else min(n, k)
+        return n or 0
+
+    # ---------- 读取 ----------
+    def dates(self, code):
+        try:
+            names = os.listdir(os.path.join(self.root, code))
+        except OSError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith('.time'))
+
+    def day(self, code, date):
+        """返回某日的 (times, prices, volumes)，均为只读memmap"""
+        n = self._rows(code, date)
+        if not n:
+            return tuple(np.zeros(0, dtype=dt) for _, dt in COLUMNS)
+        return tuple(np.memmap(self._path(code, date, col), dtype=dt, mode='r', shape=(n,))
+                     for col, dt in COLUMNS)
+
+    def days(self, code, n=5, before=None):
+        """最近n个交易日 [(date, times, prices, volumes), ...]，按日期升序；before限定早于该日期"""
+        ds = [d for d in self.dates(code) if before is None or d < before][-n:]
+        return [(d,) + self.day(code, d) for d in ds]
+
+    def history(self, code, n=5, before=None):
+        """最近n日拼接成连续数组 (dates, times, prices, volumes)；需要拼接时才产生拷贝"""
+        parts = self.days(code, n, before)
+        if not parts:
+            return (np.zeros(0, dtype='U6'),) + tuple(np.zeros(0, dtype=dt) for _, dt in COLUMNS)
+        dates = np.concatenate([np.full(len(t), d, dtype='U6') for d, t, _, _ in parts])
+        return (dates,) + tuple(np.concatenate([p[i] for p in parts]) for i in (1, 2, 3))
+
+    # ---------- 写入 ----------
+    def _last_time(self, code, date):
+        key = (code, date)
+        if key not in self._last:
+            n = self._rows(code, date)
+            # 截掉中断写入造成的列长度不一致
+            for col, dt in COLUMNS:
+                path = self._path(code, date, col)
+                if os.path.exists(path) and os.path.getsize(path) != n * dt.itemsize:
+                    with open(path, 'r+b') as f:
+                        f.truncate(n * dt.itemsize)
+            self._last[key] = int(self.day(code, date)[0][-1]) if n else -1
+        return self._last[key]
+
+    def append(self, code, date, times, prices, volumes):
+        """追加新分钟，更早的时间自动跳过（重启后重新拉取整天数据时不会重复）；返回写入条数
+
+        与已存最后一分钟相同的时间覆盖该行：分时文件在该分钟结束前会不断改写最后一行。
+        """
+        times = np.asarray(times)
+        with self._lock:
+            last = self._last_time(code, date)
+            same = np.flatnonzero(times == last)[-1:]
+            keep = times > last
+            if not len(same) and not keep.any():
+                return 0
+            os.makedirs(os.path.join(self.root, code), exist_ok=True)
+            n = self._rows(code, date)
+            for (col, dt), arr in zip(COLUMNS, (times, prices, volumes)):
+                arr = np.asarray(arr)
+                if len(same):
+                    with open(self._path(code, date, col), 'r+b') as f:
+                        f.seek((n - 1) * dt.itemsize)
+                        f.write(np.ascontiguousarray(arr[same], dtype=dt).tobytes())
+                if keep.any():
+                    with open(self._path(code, date, col), 'ab') as f:
+                        f.write(np.ascontiguousarray(arr[keep], dtype=dt).tobytes())
+            if keep.any():
+                self._last[(code, date)] = int(times[keep][-1])
+            return len(same) + int(keep.sum())